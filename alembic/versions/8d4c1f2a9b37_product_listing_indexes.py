@@ -0,0 +1,30 @@
+"""product listing indexes
+
+Revision ID: 8d4c1f2a9b37
+Revises: 26651686583e
+Create Date: 2026-10-18 12:10:41.218305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4c1f2a9b37'
+down_revision: Union[str, None] = '26651686583e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_products_store_created_at', 'products', ['store_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_products_store_status_created_at', 'products', ['store_id', 'status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_products_store_status_price', 'products', ['store_id', 'status', 'price', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_store_status_price', table_name='products')
+    op.drop_index('ix_products_store_status_created_at', table_name='products')
+    op.drop_index('ix_products_store_created_at', table_name='products')
@@ -0,0 +1,48 @@
+"""shard product sales rollups
+
+Revision ID: a3d8f61c2e95
+Revises: f7c3e9a26b14
+Create Date: 2026-10-18 20:14:37.905216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d8f61c2e95'
+down_revision: Union[str, None] = 'f7c3e9a26b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # существующие строки попадают в shard 0, при чтении shard-ы суммируются
+    op.add_column('product_sales_daily_rollups', sa.Column('shard', sa.Integer(), server_default='0', nullable=False))
+    op.alter_column('product_sales_daily_rollups', 'shard', server_default=None)
+    op.drop_constraint('product_sales_daily_rollups_pkey', 'product_sales_daily_rollups', type_='primary')
+    op.create_primary_key(
+        'product_sales_daily_rollups_pkey', 'product_sales_daily_rollups', ['store_id', 'day', 'product_id', 'shard']
+    )
+
+
+def downgrade() -> None:
+    # shard-ы одного товара за день сливаются обратно в одну строку
+    op.execute("""
+        CREATE TEMP TABLE product_rollups_merged AS
+        SELECT store_id, day, product_id, max(product_name) AS product_name,
+               sum(quantity) AS quantity, sum(revenue) AS revenue
+        FROM product_sales_daily_rollups
+        GROUP BY store_id, day, product_id
+    """)
+    op.execute("DELETE FROM product_sales_daily_rollups")
+    op.drop_constraint('product_sales_daily_rollups_pkey', 'product_sales_daily_rollups', type_='primary')
+    op.drop_column('product_sales_daily_rollups', 'shard')
+    op.create_primary_key('product_sales_daily_rollups_pkey', 'product_sales_daily_rollups', ['store_id', 'day', 'product_id'])
+    op.execute("""
+        INSERT INTO product_sales_daily_rollups (store_id, day, product_id, product_name, quantity, revenue)
+        SELECT store_id, day, product_id, product_name, quantity, revenue FROM product_rollups_merged
+    """)
+    op.execute("DROP TABLE product_rollups_merged")
@@ -0,0 +1,204 @@
+"""partition orders by month
+
+Revision ID: b7e5d2f90c31
+Revises: a92c7e3d15f4
+Create Date: 2026-10-18 16:54:41.118302
+
+orders секционируется по created_at, order_items — по order_created_at
+(копия даты заказа), поэтому позиции заказа всегда лежат в секции того же
+месяца. Первичные ключи расширены ключом секционирования, а внешние ключи на
+orders.id сняты: Postgres не умеет ссылаться на секционированную таблицу без
+ключа секционирования, целостность обеспечивает код оформления заказа.
+
+Данные копируются в одной транзакции под эксклюзивной блокировкой —
+на большой базе запускать в окно обслуживания.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e5d2f90c31'
+down_revision: Union[str, None] = 'a92c7e3d15f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ORDER_COLUMNS = (
+    "id, store_id, customer_email, customer_name, customer_phone, shipping_address, billing_address, "
+    "total_amount, status, payment_method, payment_status, payment_id, notes"
+)
+ORDER_ITEM_COLUMNS = "order_id, product_id, product_name, variant_info, quantity, price"
+
+CREATE_MONTHLY_PARTITION = """
+CREATE OR REPLACE FUNCTION create_monthly_partition(parent text, key_column text, month date)
+RETURNS text LANGUAGE plpgsql AS $$
+DECLARE
+    start_at date := date_trunc('month', month)::date;
+    end_at date := (date_trunc('month', month) + interval '1 month')::date;
+    part_name text := format('%s_%s', parent, to_char(start_at, 'YYYY_MM'));
+BEGIN
+    -- несколько реплик могут проверять секции одновременно
+    PERFORM pg_advisory_xact_lock(hashtext('partitions:' || parent));
+    IF to_regclass(part_name) IS NOT NULL THEN
+        RETURN part_name;
+    END IF;
+    -- строки месяца, успевшие попасть в DEFAULT, переносим, иначе ATTACH не пройдёт
+    EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS)', part_name, parent);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM %I WHERE %I >= %L AND %I < %L RETURNING *) INSERT INTO %I SELECT * FROM moved',
+        parent || '_default', key_column, start_at, key_column, end_at, part_name
+    );
+    EXECUTE format(
+        'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        parent, part_name, start_at, end_at
+    );
+    RETURN part_name;
+END $$
+"""
+
+ENSURE_MONTHLY_PARTITIONS = """
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(parent text, key_column text, months_ahead int)
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    FOR i IN 0..months_ahead LOOP
+        PERFORM create_monthly_partition(
+            parent, key_column, (date_trunc('month', now()) + make_interval(months => i))::date
+        );
+    END LOOP;
+END $$
+"""
+
+
+def _order_columns(created_at_nullable: bool) -> list:
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('orders_id_seq'::regclass)"), nullable=False),
+        sa.Column('store_id', sa.Integer(), nullable=False),
+        sa.Column('customer_email', sa.String(length=255), nullable=False),
+        sa.Column('customer_name', sa.String(length=255), nullable=True),
+        sa.Column('customer_phone', sa.String(length=50), nullable=True),
+        sa.Column('shipping_address', sa.JSON(), nullable=True),
+        sa.Column('billing_address', sa.JSON(), nullable=True),
+        sa.Column('total_amount', sa.DECIMAL(precision=10, scale=2), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.Column('payment_method', sa.String(length=50), nullable=True),
+        sa.Column('payment_status', sa.String(length=50), nullable=True),
+        sa.Column('payment_id', sa.String(length=100), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=created_at_nullable),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['store_id'], ['stores.id'], ),
+    ]
+
+
+def _order_item_columns() -> list:
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('order_items_id_seq'::regclass)"), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('product_name', sa.String(length=255), nullable=False),
+        sa.Column('variant_info', sa.JSON(), nullable=True),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('price', sa.DECIMAL(precision=10, scale=2), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    ]
+
+
+def _create_order_indexes() -> None:
+    op.create_index('ix_orders_store_created_at', 'orders', ['store_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_orders_payment_id', 'orders', ['payment_id'], unique=False)
+    op.create_index('ix_order_items_order_id', 'order_items', ['order_id'], unique=False)
+
+
+def _drop_order_indexes(orders: str, order_items: str) -> None:
+    op.drop_index('ix_order_items_order_id', table_name=order_items)
+    op.drop_index('ix_orders_payment_id', table_name=orders)
+    op.drop_index('ix_orders_store_created_at', table_name=orders)
+
+
+def _detach_tables(suffix: str) -> None:
+    """Переименовывает текущие таблицы и освобождает глобальные имена индексов и последовательностей."""
+    for table in ('orders', 'order_items'):
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_{suffix}")
+        op.execute(f"ALTER TABLE {table}_{suffix} RENAME CONSTRAINT {table}_pkey TO {table}_{suffix}_pkey")
+    _drop_order_indexes(f'orders_{suffix}', f'order_items_{suffix}')
+
+
+def _finish_tables(suffix: str) -> None:
+    _create_order_indexes()
+    for table in ('orders', 'order_items'):
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+        op.drop_table(f'{table}_{suffix}')
+
+
+def upgrade() -> None:
+    op.drop_constraint('order_items_order_id_fkey', 'order_items', type_='foreignkey')
+    op.drop_constraint('payment_outbox_order_id_fkey', 'payment_outbox', type_='foreignkey')
+    _detach_tables('legacy')
+
+    op.create_table('orders',
+    *_order_columns(created_at_nullable=False),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    op.create_table('order_items',
+    *_order_item_columns(),
+    sa.Column('order_created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id', 'order_created_at'),
+    postgresql_partition_by='RANGE (order_created_at)'
+    )
+    op.execute("CREATE TABLE orders_default PARTITION OF orders DEFAULT")
+    op.execute("CREATE TABLE order_items_default PARTITION OF order_items DEFAULT")
+    op.execute(CREATE_MONTHLY_PARTITION)
+    op.execute(ENSURE_MONTHLY_PARTITIONS)
+
+    # секции под уже накопленную историю и на несколько месяцев вперёд
+    for parent, key_column in (('orders', 'created_at'), ('order_items', 'order_created_at')):
+        op.execute(
+            f"SELECT create_monthly_partition('{parent}', '{key_column}', month) FROM ("
+            "SELECT DISTINCT date_trunc('month', coalesce(created_at, now()))::date AS month FROM orders_legacy"
+            ") months"
+        )
+        op.execute(f"SELECT ensure_monthly_partitions('{parent}', '{key_column}', 3)")
+
+    op.execute(
+        f"INSERT INTO orders ({ORDER_COLUMNS}, created_at, updated_at) "
+        f"SELECT {ORDER_COLUMNS}, coalesce(created_at, now()), updated_at FROM orders_legacy"
+    )
+    op.execute(
+        f"INSERT INTO order_items (id, {ORDER_ITEM_COLUMNS}, created_at, order_created_at) "
+        f"SELECT i.id, {', '.join('i.' + c for c in ORDER_ITEM_COLUMNS.split(', '))}, i.created_at, "
+        "coalesce(o.created_at, now()) "
+        "FROM order_items_legacy i JOIN orders_legacy o ON o.id = i.order_id"
+    )
+    _finish_tables('legacy')
+
+
+def downgrade() -> None:
+    _detach_tables('partitioned')
+
+    op.create_table('orders',
+    *_order_columns(created_at_nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('order_items',
+    *_order_item_columns(),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(
+        f"INSERT INTO orders ({ORDER_COLUMNS}, created_at, updated_at) "
+        f"SELECT {ORDER_COLUMNS}, created_at, updated_at FROM orders_partitioned"
+    )
+    op.execute(
+        f"INSERT INTO order_items (id, {ORDER_ITEM_COLUMNS}, created_at) "
+        f"SELECT id, {ORDER_ITEM_COLUMNS}, created_at FROM order_items_partitioned"
+    )
+    _finish_tables('partitioned')
+    op.create_foreign_key('payment_outbox_order_id_fkey', 'payment_outbox', 'orders', ['order_id'], ['id'])
+    op.execute("DROP FUNCTION ensure_monthly_partitions(text, text, int)")
+    op.execute("DROP FUNCTION create_monthly_partition(text, text, date)")
@@ -0,0 +1,27 @@
+"""product price index
+
+Revision ID: b9e4c2d7f318
+Revises: a3d8f61c2e95
+Create Date: 2026-10-18 20:41:08.362914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e4c2d7f318'
+down_revision: Union[str, None] = 'a3d8f61c2e95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # keyset-листинг status=all с сортировкой по цене; без него — сортировка всех товаров магазина
+    op.create_index('ix_products_store_price', 'products', ['store_id', 'price', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_store_price', table_name='products')
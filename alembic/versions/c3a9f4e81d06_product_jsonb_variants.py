@@ -0,0 +1,34 @@
+"""product jsonb variants
+
+Revision ID: c3a9f4e81d06
+Revises: b61e07d5c2f4
+Create Date: 2026-10-18 13:41:55.102734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a9f4e81d06'
+down_revision: Union[str, None] = 'b61e07d5c2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column('products', 'images', type_=postgresql.JSONB(), existing_nullable=True, postgresql_using='images::jsonb')
+    op.alter_column('products', 'variants', type_=postgresql.JSONB(), existing_nullable=True, postgresql_using='variants::jsonb')
+    op.create_index(
+        'ix_products_variants', 'products', ['variants'], unique=False,
+        postgresql_using='gin', postgresql_ops={'variants': 'jsonb_path_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_variants', table_name='products', postgresql_using='gin')
+    op.alter_column('products', 'variants', type_=sa.JSON(), existing_nullable=True, postgresql_using='variants::json')
+    op.alter_column('products', 'images', type_=sa.JSON(), existing_nullable=True, postgresql_using='images::json')
@@ -0,0 +1,48 @@
+"""payment webhook events
+
+Revision ID: c4f8a1d63e27
+Revises: b7e5d2f90c31
+Create Date: 2026-10-18 17:32:15.904467
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f8a1d63e27'
+down_revision: Union[str, None] = 'b7e5d2f90c31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('payment_webhook_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('payment_id', sa.String(length=100), nullable=False),
+    sa.Column('event_type', sa.String(length=50), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('received_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('payment_id', 'event_type', name='uq_payment_webhook_events_payment_event')
+    )
+    op.create_index(
+        'ix_payment_webhook_events_pending', 'payment_webhook_events', ['next_attempt_at'], unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_payment_webhook_events_pending', table_name='payment_webhook_events',
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+    op.drop_table('payment_webhook_events')
@@ -0,0 +1,32 @@
+"""unpaid orders index
+
+Revision ID: d5a3c8e71f46
+Revises: c4f8a1d63e27
+Create Date: 2026-10-18 18:05:52.671240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a3c8e71f46'
+down_revision: Union[str, None] = 'c4f8a1d63e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_orders_unpaid_created_at', 'orders', ['created_at', 'id'], unique=False,
+        postgresql_where=sa.text("payment_status = 'unpaid'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_orders_unpaid_created_at', table_name='orders',
+        postgresql_where=sa.text("payment_status = 'unpaid'"),
+    )
@@ -0,0 +1,47 @@
+"""payment outbox
+
+Revision ID: d7f2b8a05e13
+Revises: c3a9f4e81d06
+Create Date: 2026-10-18 14:26:08.614290
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f2b8a05e13'
+down_revision: Union[str, None] = 'c3a9f4e81d06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('orders', sa.Column('payment_id', sa.String(length=100), nullable=True))
+    op.create_index('ix_orders_payment_id', 'orders', ['payment_id'], unique=False)
+    op.create_table('payment_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.DECIMAL(precision=10, scale=2), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_payment_outbox_pending', 'payment_outbox', ['next_attempt_at'], unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payment_outbox_pending', table_name='payment_outbox', postgresql_where=sa.text("status = 'pending'"))
+    op.drop_table('payment_outbox')
+    op.drop_index('ix_orders_payment_id', table_name='orders')
+    op.drop_column('orders', 'payment_id')
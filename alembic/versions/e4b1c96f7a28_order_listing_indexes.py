@@ -0,0 +1,28 @@
+"""order listing indexes
+
+Revision ID: e4b1c96f7a28
+Revises: d7f2b8a05e13
+Create Date: 2026-10-18 15:03:44.890126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b1c96f7a28'
+down_revision: Union[str, None] = 'd7f2b8a05e13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_orders_store_created_at', 'orders', ['store_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_order_items_order_id', 'order_items', ['order_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_order_items_order_id', table_name='order_items')
+    op.drop_index('ix_orders_store_created_at', table_name='orders')
@@ -0,0 +1,48 @@
+"""sales rollups
+
+Revision ID: f58d3a1c6b92
+Revises: e4b1c96f7a28
+Create Date: 2026-10-18 15:48:20.377451
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f58d3a1c6b92'
+down_revision: Union[str, None] = 'e4b1c96f7a28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('sales_daily_rollups',
+    sa.Column('store_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('orders_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.DECIMAL(precision=14, scale=2), nullable=False),
+    sa.Column('paid_orders_count', sa.Integer(), nullable=False),
+    sa.Column('paid_revenue', sa.DECIMAL(precision=14, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['store_id'], ['stores.id'], ),
+    sa.PrimaryKeyConstraint('store_id', 'day', 'shard')
+    )
+    op.create_table('product_sales_daily_rollups',
+    sa.Column('store_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('product_name', sa.String(length=255), nullable=True),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.DECIMAL(precision=14, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['store_id'], ['stores.id'], ),
+    sa.PrimaryKeyConstraint('store_id', 'day', 'product_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('product_sales_daily_rollups')
+    op.drop_table('sales_daily_rollups')
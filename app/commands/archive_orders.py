@@ -0,0 +1,108 @@
+"""Выгружает и удаляет старые месячные секции orders/order_items.
+
+    python -m app.commands.archive_orders [--months 24] [--output-dir archive/orders] [--dry-run]
+
+Секция отсоединяется от родительской таблицы, выгружается через COPY в
+<output-dir>/<секция>.csv.gz и только после сверки числа строк удаляется.
+Отсоединённые, но не удалённые секции (например, после сбоя) подхватываются
+повторным запуском. Дневные итоги продаж не трогаются, поэтому аналитика за
+архивные месяцы остаётся; backfill_sales_rollups после архивации запускать
+с --since, иначе итоги за эти месяцы пересчитаются из пустых таблиц.
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import re
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine
+from app.services.order_partition_service import PARTITIONED_TABLES
+
+PARTITION_NAME = re.compile(r"^(orders|order_items)_(\d{4})_(\d{2})$")
+
+LIST_PARTITIONS = text("""
+    SELECT c.relname, i.inhparent IS NOT NULL AS attached
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace AND n.nspname = current_schema()
+    LEFT JOIN pg_inherits i ON i.inhrelid = c.oid
+    WHERE c.relkind = 'r' AND c.relname ~ '^(orders|order_items)_[0-9]{4}_[0-9]{2}$'
+""")
+
+
+def _cutoff(months: int) -> date:
+    today = date.today()
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def _find_partitions(cutoff: date) -> list[tuple[str, str, bool]]:
+    async with engine.connect() as conn:
+        rows = (await conn.execute(LIST_PARTITIONS)).all()
+    found = []
+    for name, attached in rows:
+        parent, year, month = PARTITION_NAME.match(name).groups()
+        if date(int(year), int(month), 1) < cutoff:
+            found.append((parent, name, attached))
+    return sorted(found, key=lambda p: p[1])
+
+
+async def _archive(parent: str, name: str, attached: bool, output_dir: Path) -> None:
+    if attached:
+        async with engine.begin() as conn:
+            await conn.execute(text(f'ALTER TABLE "{parent}" DETACH PARTITION "{name}"'))
+
+    target = output_dir / f"{name}.csv.gz"
+    tmp_path = target.with_suffix(".gz.tmp")
+    async with engine.connect() as conn:
+        expected = (await conn.execute(text(f'SELECT count(*) FROM "{name}"'))).scalar_one()
+        raw = await conn.get_raw_connection()
+        with gzip.open(tmp_path, "wb") as out:
+            async def sink(chunk: bytes) -> None:
+                out.write(chunk)
+
+            status = await raw.driver_connection.copy_from_table(name, output=sink, format="csv", header=True)
+            out.flush()
+            os.fsync(out.fileobj.fileno())
+
+    copied = int(status.split()[-1])
+    if copied != expected:
+        tmp_path.unlink(missing_ok=True)
+        raise RuntimeError(f"{name}: copied {copied} rows, expected {expected}; partition kept")
+    os.replace(tmp_path, target)
+
+    async with engine.begin() as conn:
+        await conn.execute(text(f'DROP TABLE "{name}"'))
+    print(f"Archived {name}: {copied} rows -> {target}")
+
+
+async def main(months: int, output_dir: Path, dry_run: bool) -> None:
+    cutoff = _cutoff(months)
+    partitions = await _find_partitions(cutoff)
+    if not partitions:
+        print(f"Nothing to archive before {cutoff}")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for parent, name, attached in partitions:
+        if parent not in PARTITIONED_TABLES:
+            continue
+        if dry_run:
+            print(f"Would archive {name}{'' if attached else ' (already detached)'}")
+            continue
+        await _archive(parent, name, attached, output_dir)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months", type=int, default=settings.ORDERS_RETENTION_MONTHS,
+                        help="keep this many full months before the current one")
+    parser.add_argument("--output-dir", type=Path, default=Path(settings.ORDERS_ARCHIVE_DIR))
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.months, args.output_dir, args.dry_run))
@@ -0,0 +1,104 @@
+"""Пересобирает таблицы дневных итогов продаж из orders/order_items.
+
+    python -m app.commands.backfill_sales_rollups [--batch-size 100] [--store-id 1 --store-id 2] [--since 2026-01-01]
+
+Магазины обрабатываются пачками: для каждой пачки итоги удаляются и считаются
+заново одним INSERT ... SELECT в отдельной транзакции. С --since пересчитываются
+только дни начиная с этой даты — так итоги за архивированные месяцы сохраняются.
+"""
+import argparse
+import asyncio
+from datetime import date
+
+from sqlalchemy import Date, and_, cast, delete, insert, literal_column, select
+from sqlalchemy.sql import func
+
+from app.config import settings
+from app.database import (
+    Order,
+    OrderItem,
+    ProductSalesDailyRollup,
+    SalesDailyRollup,
+    SessionLocal,
+    Store,
+    engine,
+)
+from app.services.analytics_service import PAID_STATUS
+
+
+async def _rebuild(store_ids: list[int], since: date | None) -> None:
+    day = cast(Order.created_at, Date)
+    orders_filter = [Order.store_id.in_(store_ids)]
+    sales_filter = [SalesDailyRollup.store_id.in_(store_ids)]
+    products_filter = [ProductSalesDailyRollup.store_id.in_(store_ids)]
+    if since:
+        orders_filter.append(Order.created_at >= since)
+        sales_filter.append(SalesDailyRollup.day >= since)
+        products_filter.append(ProductSalesDailyRollup.day >= since)
+    shard = Order.id % literal_column(str(settings.ANALYTICS_ROLLUP_SHARDS))
+    is_paid = Order.payment_status == PAID_STATUS
+    sales = (
+        select(
+            Order.store_id,
+            day,
+            shard,
+            func.count(),
+            func.sum(Order.total_amount),
+            func.count().filter(is_paid),
+            func.coalesce(func.sum(Order.total_amount).filter(is_paid), 0),
+        )
+        .where(*orders_filter)
+        .group_by(Order.store_id, day, shard)
+    )
+    products = (
+        select(
+            Order.store_id,
+            day,
+            OrderItem.product_id,
+            shard,
+            func.max(OrderItem.product_name),
+            func.sum(OrderItem.quantity),
+            func.sum(OrderItem.price * OrderItem.quantity),
+        )
+        .join(Order, and_(Order.id == OrderItem.order_id, Order.created_at == OrderItem.order_created_at))
+        .where(*orders_filter)
+        .group_by(Order.store_id, day, OrderItem.product_id, shard)
+    )
+
+    async with SessionLocal() as db:
+        await db.execute(delete(SalesDailyRollup).where(*sales_filter))
+        await db.execute(delete(ProductSalesDailyRollup).where(*products_filter))
+        await db.execute(insert(SalesDailyRollup).from_select(
+            ["store_id", "day", "shard", "orders_count", "revenue", "paid_orders_count", "paid_revenue"], sales,
+        ))
+        await db.execute(insert(ProductSalesDailyRollup).from_select(
+            ["store_id", "day", "product_id", "shard", "product_name", "quantity", "revenue"], products,
+        ))
+        await db.commit()
+
+
+async def main(batch_size: int, only_store_ids: list[int] | None, since: date | None) -> None:
+    last_id = 0
+    while True:
+        query = select(Store.id).where(Store.id > last_id).order_by(Store.id).limit(batch_size)
+        if only_store_ids:
+            query = query.where(Store.id.in_(only_store_ids))
+        async with SessionLocal() as db:
+            store_ids = list((await db.execute(query)).scalars().all())
+        if not store_ids:
+            break
+
+        await _rebuild(store_ids, since)
+        print(f"Rebuilt sales rollups for stores {store_ids[0]}..{store_ids[-1]}")
+        last_id = store_ids[-1]
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=100, help="stores per transaction")
+    parser.add_argument("--store-id", type=int, action="append", help="rebuild only these stores")
+    parser.add_argument("--since", type=date.fromisoformat, help="rebuild only days starting from this date")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.store_id, args.since))
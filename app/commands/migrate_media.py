@@ -0,0 +1,116 @@
+"""Переносит плоские загрузки из MEDIA_ROOT в хранилище по хэшу содержимого.
+
+    python -m app.commands.migrate_media [--batch-size 500] [--dry-run]
+
+Каждый файл верхнего уровня MEDIA_ROOT (<uuid>.jpg) хэшируется и
+переименовывается в ab/cd/<sha256><расширение> — это rename в пределах одной
+файловой системы, без копирования. Одинаковые файлы схлопываются в один, а
+ref_count в media_files считает, сколько старых файлов на него ссылается.
+Старое имя записывается в media_aliases, поэтому уже сохранённые в товарах и
+витринах ссылки /v1/api/media/upload/<uuid>.jpg продолжают открываться.
+
+Запись в БД идёт раньше переноса файла, а ref_count растёт только для новых
+алиасов, поэтому прерванный прогон можно просто запустить ещё раз. Каталоги
+(в том числе storefronts/ и уже разложенные ab/cd/) и скрытые файлы пропускаются.
+Прямые ссылки на статику /uploads/<uuid>.jpg после переноса перестают работать.
+"""
+import argparse
+import asyncio
+import hashlib
+import mimetypes
+import os
+from pathlib import Path
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.database import MediaAlias, MediaFile, SessionLocal, engine
+from app.services.media_service import normalize_suffix, sharded_path
+
+
+def _scan(root: Path) -> list[Path]:
+    return sorted(p for p in root.iterdir() if p.is_file() and not p.name.startswith("."))
+
+
+def _hash_file(path: Path) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    with path.open("rb") as source:
+        while chunk := source.read(settings.MEDIA_UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            digest.update(chunk)
+    return digest.hexdigest(), size
+
+
+def _move(source: Path, target: Path) -> bool:
+    """True — файл перенесён, False — такие байты уже лежали по адресу и дубль удалён."""
+    if target.exists():
+        source.unlink()
+        return False
+    target.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(source, target)
+    return True
+
+
+async def _migrate_batch(root: Path, files: list[Path], dry_run: bool) -> tuple[int, int]:
+    hashed = [(path, *await asyncio.to_thread(_hash_file, path)) for path in files]
+    if dry_run:
+        return len(hashed), len(hashed) - len({sha256 for _, sha256, _ in hashed})
+
+    targets = []
+    async with SessionLocal() as db:
+        for path, sha256, size in hashed:
+            await db.execute(
+                insert(MediaFile).values(
+                    sha256=sha256,
+                    path=sharded_path(sha256, normalize_suffix(path.name)),
+                    size=size,
+                    content_type=mimetypes.guess_type(path.name)[0],
+                    ref_count=0,
+                )
+                .on_conflict_do_nothing(index_elements=[MediaFile.sha256])
+            )
+            alias_added = (await db.execute(
+                insert(MediaAlias).values(name=path.name, sha256=sha256)
+                .on_conflict_do_nothing(index_elements=[MediaAlias.name])
+                .returning(MediaAlias.name)
+            )).scalar_one_or_none()
+            # алиас мог остаться от прерванного прогона — тогда ссылка уже посчитана
+            target = (await db.execute(
+                update(MediaFile)
+                .where(MediaFile.sha256 == sha256)
+                .values(ref_count=MediaFile.ref_count + (1 if alias_added else 0))
+                .returning(MediaFile.path)
+            )).scalar_one()
+            targets.append((path, root / target))
+        await db.commit()
+
+    moved = 0
+    for source, target in targets:
+        moved += await asyncio.to_thread(_move, source, target)
+    return len(targets), len(targets) - moved
+
+
+async def main(batch_size: int, dry_run: bool) -> None:
+    root = Path(settings.MEDIA_ROOT)
+    files = _scan(root)
+    migrated = duplicates = 0
+    try:
+        for start in range(0, len(files), batch_size):
+            batch_migrated, batch_duplicates = await _migrate_batch(root, files[start:start + batch_size], dry_run)
+            migrated += batch_migrated
+            duplicates += batch_duplicates
+    finally:
+        await engine.dispose()
+
+    prefix = "Would migrate" if dry_run else "Migrated"
+    print(f"{prefix} {migrated} files, {duplicates} duplicates")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500, help="files per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="only count files and duplicates")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.dry_run))
@@ -0,0 +1,118 @@
+"""Сверяет неоплаченные заказы со статусом платежей в ЮKassa.
+
+    python -m app.commands.reconcile_payments [--min-age 15] [--max-age 48] [--batch-size 200] [--concurrency 10]
+
+Страховка от потерянных webhook-ов, запускается по расписанию (cron).
+Берутся заказы с payment_status='unpaid' и известным payment_id, созданные
+от --max-age часов до --min-age минут назад, keyset-пачками по (created_at, id).
+Статусы пачки запрашиваются параллельно, но не больше --concurrency запросов
+одновременно; если цепь ЮKassa разомкнута, прогон останавливается. Изменения
+пачки применяются одним UPDATE (см. payment_status_service). Заказы без
+payment_id не трогаются — их платёж ещё создаёт payment_outbox.
+
+Для локальной проверки YOOKASSA_API_URL направляется на заглушку
+benchmarks/fake_yookassa.py.
+"""
+import argparse
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.sql import func
+
+from app.config import settings
+from app.database import Order, SessionLocal, engine
+from app.services.analytics_service import PAID_STATUS
+from app.services.payment_status_service import apply_payment_updates, update_from_payment
+from app.services.yookassa_payment_service import PaymentProviderUnavailable, close_client, get_payment
+
+UNPAID_STATUS = "unpaid"
+
+
+async def _load_batch(after: tuple | None, min_age: int, max_age: int, batch_size: int) -> list:
+    query = (
+        select(Order.id, Order.created_at, Order.payment_id)
+        .where(
+            Order.payment_status == UNPAID_STATUS,
+            Order.payment_id.is_not(None),
+            Order.created_at >= func.now() - timedelta(hours=max_age),
+            Order.created_at < func.now() - timedelta(minutes=min_age),
+        )
+        .order_by(Order.created_at, Order.id)
+        .limit(batch_size)
+    )
+    if after:
+        query = query.where(tuple_(Order.created_at, Order.id) > tuple_(*after))
+    async with SessionLocal() as db:
+        return list((await db.execute(query)).all())
+
+
+async def _fetch(semaphore: asyncio.Semaphore, payment_id: str) -> dict | None:
+    async with semaphore:
+        return await get_payment(settings.YOOKASSA_SHOP_ID, settings.YOOKASSA_SECRET_KEY, payment_id)
+
+
+async def _reconcile_batch(rows: list, semaphore: asyncio.Semaphore) -> tuple[list, int]:
+    results = await asyncio.gather(*(_fetch(semaphore, row.payment_id) for row in rows), return_exceptions=True)
+
+    updates, errors = [], 0
+    for row, result in zip(rows, results):
+        if isinstance(result, PaymentProviderUnavailable):
+            raise result
+        if isinstance(result, Exception):
+            print(f"Order {row.id}: {result}")
+            errors += 1
+            continue
+        if result is None:
+            continue
+        try:
+            status_update = update_from_payment(result)
+        except (ValueError, KeyError, TypeError) as e:
+            # неполный ответ провайдера — ошибка этого заказа, а не всего прогона
+            print(f"Order {row.id}: invalid payment payload: {e!r}")
+            errors += 1
+            continue
+        if status_update is not None and status_update.order_id == row.id:
+            updates.append(status_update)
+
+    async with SessionLocal() as db:
+        changes = await apply_payment_updates(db, updates)
+        await db.commit()
+    return changes, errors
+
+
+async def main(min_age: int, max_age: int, batch_size: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    checked = paid = canceled = errors = 0
+    after = None
+    try:
+        while True:
+            rows = await _load_batch(after, min_age, max_age, batch_size)
+            if not rows:
+                break
+            changes, batch_errors = await _reconcile_batch(rows, semaphore)
+            checked += len(rows)
+            errors += batch_errors
+            paid += sum(1 for c in changes if c.new_status == PAID_STATUS)
+            canceled += sum(1 for c in changes if c.new_status != PAID_STATUS)
+            after = (rows[-1].created_at, rows[-1].id)
+    except PaymentProviderUnavailable as e:
+        print(f"Stopped early: {e}")
+    finally:
+        await close_client()
+        await engine.dispose()
+
+    print(f"Checked {checked} orders: {paid} paid, {canceled} canceled, {errors} errors")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-age", type=int, default=settings.RECONCILE_MIN_AGE_MINUTES,
+                        help="skip orders younger than this many minutes")
+    parser.add_argument("--max-age", type=int, default=settings.RECONCILE_MAX_AGE_HOURS,
+                        help="skip orders older than this many hours")
+    parser.add_argument("--batch-size", type=int, default=settings.RECONCILE_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=settings.RECONCILE_CONCURRENCY,
+                        help="max simultaneous requests to YooKassa")
+    args = parser.parse_args()
+    asyncio.run(main(args.min_age, args.max_age, args.batch_size, args.concurrency))
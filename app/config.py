@@ -17,14 +17,88 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(30, env="ACCESS_TOKEN_EXPIRE_MINUTES")
     REFRESH_TOKEN_EXPIRE_DAYS: int = Field(7, env="REFRESH_TOKEN_EXPIRE_DAYS")
+    # bcrypt считается в отдельных потоках; сверх workers + queue запросы получают 503
+    PASSWORD_HASH_WORKERS: int = Field(4, env="PASSWORD_HASH_WORKERS")
+    PASSWORD_HASH_QUEUE_LIMIT: int = Field(32, env="PASSWORD_HASH_QUEUE_LIMIT")
+    AUTH_USER_CACHE_SIZE: int = Field(10000, env="AUTH_USER_CACHE_SIZE")
+    AUTH_USER_CACHE_TTL: int = Field(60, env="AUTH_USER_CACHE_TTL")
+    AUTH_TOKEN_CACHE_SIZE: int = Field(10000, env="AUTH_TOKEN_CACHE_SIZE")
+    # лимиты попыток входа/регистрации/сброса пароля; backend "postgres" — общие для всех реплик
+    RATE_LIMIT_BACKEND: str = Field("memory", env="RATE_LIMIT_BACKEND")
+    RATE_LIMIT_IP_PER_MINUTE: float = Field(30, env="RATE_LIMIT_IP_PER_MINUTE")
+    RATE_LIMIT_IP_BURST: int = Field(30, env="RATE_LIMIT_IP_BURST")
+    RATE_LIMIT_EMAIL_PER_MINUTE: float = Field(5, env="RATE_LIMIT_EMAIL_PER_MINUTE")
+    RATE_LIMIT_EMAIL_BURST: int = Field(10, env="RATE_LIMIT_EMAIL_BURST")
+    RATE_LIMIT_MAX_KEYS: int = Field(100000, env="RATE_LIMIT_MAX_KEYS")
 
+    SMTP_HOST: str = Field("smtp.gmail.com", env="SMTP_HOST")
+    SMTP_PORT: int = Field(465, env="SMTP_PORT")
+    # для локальной заглушки (benchmarks/smtp_sink.py): SMTP_USE_SSL=false, SMTP_PORT=1025, пустой SMTP_USER, MAIL_FROM
+    SMTP_USE_SSL: bool = Field(True, env="SMTP_USE_SSL")
+    SMTP_TIMEOUT: float = Field(10.0, env="SMTP_TIMEOUT")
     SMTP_USER: str = Field("", env="SMTP_USER")
     SMTP_PASSWORD: str = Field("", env="SMTP_PASSWORD")
+    MAIL_FROM: str = Field("", env="MAIL_FROM")
+    SMTP_IDLE_TIMEOUT: float = Field(60.0, env="SMTP_IDLE_TIMEOUT")
+    MAIL_QUEUE_SIZE: int = Field(1000, env="MAIL_QUEUE_SIZE")
+    MAIL_BATCH_SIZE: int = Field(50, env="MAIL_BATCH_SIZE")
+    MAIL_MAX_ATTEMPTS: int = Field(5, env="MAIL_MAX_ATTEMPTS")
+    MAIL_RETRY_BASE_DELAY: float = Field(5.0, env="MAIL_RETRY_BASE_DELAY")
+    MAIL_POLL_INTERVAL: float = Field(1.0, env="MAIL_POLL_INTERVAL")
 
     MEDIA_ROOT: str = Field("uploads", env="MEDIA_ROOT")
     MEDIA_URL: str = Field("/uploads", env="MEDIA_URL")
+    MEDIA_MAX_UPLOAD_BYTES: int = Field(10 * 1024 * 1024, env="MEDIA_MAX_UPLOAD_BYTES")
+    MEDIA_UPLOAD_CHUNK_SIZE: int = Field(1024 * 1024, env="MEDIA_UPLOAD_CHUNK_SIZE")
     PUBLIC_BASE_URL: str = Field("http://localhost:8000", env="PUBLIC_BASE_URL")
 
+    STOREFRONT_CACHE_SIZE: int = Field(1024, env="STOREFRONT_CACHE_SIZE")
+    STOREFRONT_CACHE_TTL: int = Field(60, env="STOREFRONT_CACHE_TTL")
+    PRODUCTS_PAGE_SIZE: int = Field(50, env="PRODUCTS_PAGE_SIZE")
+    PRODUCTS_MAX_PAGE_SIZE: int = Field(500, env="PRODUCTS_MAX_PAGE_SIZE")
+    PRODUCT_IMPORT_BATCH_SIZE: int = Field(1000, env="PRODUCT_IMPORT_BATCH_SIZE")
+    ORDERS_PAGE_SIZE: int = Field(50, env="ORDERS_PAGE_SIZE")
+    ORDERS_MAX_PAGE_SIZE: int = Field(500, env="ORDERS_MAX_PAGE_SIZE")
+    EXPORT_BATCH_SIZE: int = Field(1000, env="EXPORT_BATCH_SIZE")
+    ANALYTICS_ROLLUP_SHARDS: int = Field(8, env="ANALYTICS_ROLLUP_SHARDS")
+
+    # YOOKASSA_API_URL можно направить на локальную заглушку провайдера
+    YOOKASSA_API_URL: str = Field("https://api.yookassa.ru/v3", env="YOOKASSA_API_URL")
+    YOOKASSA_SHOP_ID: str = Field("shop_id", env="YOOKASSA_SHOP_ID") # TODO вытаскиваем эту инфу из данных магазина
+    YOOKASSA_SECRET_KEY: str = Field("secret_key", env="YOOKASSA_SECRET_KEY") # TODO вытаскиваем эту инфу из данных магазина
+    YOOKASSA_CONNECT_TIMEOUT: float = Field(3.0, env="YOOKASSA_CONNECT_TIMEOUT")
+    YOOKASSA_READ_TIMEOUT: float = Field(10.0, env="YOOKASSA_READ_TIMEOUT")
+    YOOKASSA_MAX_CONNECTIONS: int = Field(20, env="YOOKASSA_MAX_CONNECTIONS")
+    YOOKASSA_MAX_KEEPALIVE: int = Field(10, env="YOOKASSA_MAX_KEEPALIVE")
+    YOOKASSA_KEEPALIVE_EXPIRY: float = Field(30.0, env="YOOKASSA_KEEPALIVE_EXPIRY")
+    YOOKASSA_HTTP2: bool = Field(False, env="YOOKASSA_HTTP2")
+    YOOKASSA_BREAKER_THRESHOLD: int = Field(5, env="YOOKASSA_BREAKER_THRESHOLD")
+    YOOKASSA_BREAKER_RESET: float = Field(30.0, env="YOOKASSA_BREAKER_RESET")
+    PAYMENT_RETURN_URL: str = Field("https://example.com/thank-you-page", env="PAYMENT_RETURN_URL")
+
+    PAYMENT_WORKER_CONCURRENCY: int = Field(8, env="PAYMENT_WORKER_CONCURRENCY")
+    PAYMENT_WORKER_BATCH_SIZE: int = Field(50, env="PAYMENT_WORKER_BATCH_SIZE")
+    PAYMENT_WORKER_POLL_INTERVAL: float = Field(2.0, env="PAYMENT_WORKER_POLL_INTERVAL")
+    PAYMENT_WORKER_LEASE: int = Field(120, env="PAYMENT_WORKER_LEASE")
+    PAYMENT_MAX_ATTEMPTS: int = Field(8, env="PAYMENT_MAX_ATTEMPTS")
+    PAYMENT_RETRY_BASE_DELAY: float = Field(5.0, env="PAYMENT_RETRY_BASE_DELAY")
+    PAYMENT_RETRY_MAX_DELAY: float = Field(600.0, env="PAYMENT_RETRY_MAX_DELAY")
+    WEBHOOK_WORKER_BATCH_SIZE: int = Field(200, env="WEBHOOK_WORKER_BATCH_SIZE")
+    WEBHOOK_WORKER_POLL_INTERVAL: float = Field(2.0, env="WEBHOOK_WORKER_POLL_INTERVAL")
+    RECONCILE_MIN_AGE_MINUTES: int = Field(15, env="RECONCILE_MIN_AGE_MINUTES")
+    RECONCILE_MAX_AGE_HOURS: int = Field(48, env="RECONCILE_MAX_AGE_HOURS")
+    RECONCILE_BATCH_SIZE: int = Field(200, env="RECONCILE_BATCH_SIZE")
+    RECONCILE_CONCURRENCY: int = Field(10, env="RECONCILE_CONCURRENCY")
+
+    IDEMPOTENCY_KEY_TTL: int = Field(86400, env="IDEMPOTENCY_KEY_TTL")
+    IDEMPOTENCY_LOCK_TIMEOUT: int = Field(60, env="IDEMPOTENCY_LOCK_TIMEOUT")
+    IDEMPOTENCY_CLEANUP_INTERVAL: float = Field(3600.0, env="IDEMPOTENCY_CLEANUP_INTERVAL")
+
+    ORDER_PARTITIONS_AHEAD: int = Field(3, env="ORDER_PARTITIONS_AHEAD")
+    ORDER_PARTITION_CHECK_INTERVAL: float = Field(21600.0, env="ORDER_PARTITION_CHECK_INTERVAL")
+    ORDERS_RETENTION_MONTHS: int = Field(24, env="ORDERS_RETENTION_MONTHS")
+    ORDERS_ARCHIVE_DIR: str = Field("archive/orders", env="ORDERS_ARCHIVE_DIR")
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -1,18 +1,24 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship
+from sqlalchemy.orm import sessionmaker, declarative_base, relationship, deferred
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy import (
     Column,
     Integer,
     String,
     Boolean,
+    Float,
     Text,
     DateTime,
+    Date,
     ForeignKey,
     DECIMAL,
     JSON,
     Table,
+    Index,
+    Computed,
+    UniqueConstraint,
 )
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from app.config import settings
 
 # DATABASE CONNECTION
@@ -29,6 +35,17 @@ async def get_db():
         yield session
 
 
+async def fetch_all(stmt, scalars: bool = False) -> list:
+    """Выполняет запрос в отдельной сессии (своё соединение из пула).
+
+    Нужна для независимых выборок, которые запускаются параллельно через asyncio.gather:
+    одна AsyncSession не умеет выполнять несколько запросов одновременно.
+    """
+    async with SessionLocal() as session:
+        result = await session.execute(stmt)
+        return list(result.scalars().all() if scalars else result.all())
+
+
 # ============================================
 # USERS
 # ============================================
@@ -148,8 +165,26 @@ class Collection(Base):
 # PRODUCTS
 # ============================================
 
+# Поисковый вектор товара: имя/артикул/штрихкод весят больше всего, SEO-поля меньше.
+# 'simple' без стемминга, чтобы одинаково работать с русскими и английскими каталогами.
+PRODUCT_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(sku, '') || ' ' || coalesce(barcode, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(meta_title, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(meta_description, '')), 'D')"
+)
+
+
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_store_created_at", "store_id", "created_at", "id"),
+        Index("ix_products_store_price", "store_id", "price", "id"),
+        Index("ix_products_store_status_created_at", "store_id", "status", "created_at", "id"),
+        Index("ix_products_store_status_price", "store_id", "status", "price", "id"),
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_products_variants", "variants", postgresql_using="gin", postgresql_ops={"variants": "jsonb_path_ops"}),
+    )
 
     id = Column(Integer, primary_key=True)
     store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
@@ -162,10 +197,12 @@ class Product(Base):
     barcode = Column(String(100))
     stock = Column(Integer, default=0)
     status = Column(String(20), default="active")
-    images = Column(JSON)
-    variants = Column(JSON)
+    images = Column(JSONB)
+    variants = Column(JSONB)
     meta_title = Column(String(255))
     meta_description = Column(Text)
+    # генерируется самим Postgres при любой записи, в обычные выборки не попадает
+    search_vector = deferred(Column(TSVECTOR, Computed(PRODUCT_SEARCH_VECTOR, persisted=True)))
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
@@ -197,10 +234,27 @@ class CollectionProduct(Base):
 # ORDERS
 # ============================================
 
+ORDER_ITEMS_JOIN = (
+    "and_(Order.id == foreign(OrderItem.order_id), "
+    "Order.created_at == foreign(OrderItem.order_created_at))"
+)
+
+
 class Order(Base):
+    """Заказы; таблица секционирована по месяцам created_at.
+
+    Ключ секционирования входит в первичный ключ таблицы, но для ORM
+    идентичность заказа — по-прежнему id, поэтому db.get(Order, id) работает.
+    Запросы с условием или сортировкой по created_at читают только нужные секции.
+    """
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_store_created_at", "store_id", "created_at", "id"),
+        Index("ix_orders_unpaid_created_at", "created_at", "id", postgresql_where=text("payment_status = 'unpaid'")),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
     customer_email = Column(String(255), nullable=False)
     customer_name = Column(String(255))
@@ -211,12 +265,15 @@ class Order(Base):
     status = Column(String(50), default="pending")
     payment_method = Column(String(50))
     payment_status = Column(String(50), default="unpaid")
+    payment_id = Column(String(100), index=True)
     notes = Column(Text)
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTime, primary_key=True, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     store = relationship("Store", back_populates="orders")
-    items = relationship("OrderItem", back_populates="order")
+    items = relationship("OrderItem", back_populates="order", primaryjoin=ORDER_ITEMS_JOIN)
+
+    __mapper_args__ = {"primary_key": [id]}
 
 
 # ============================================
@@ -224,10 +281,17 @@ class Order(Base):
 # ============================================
 
 class OrderItem(Base):
+    """Позиции заказа; секционированы по order_created_at — дате самого заказа,
+    так что позиции лежат в секции того же месяца, что и заказ."""
     __tablename__ = "order_items"
+    __table_args__ = (
+        {"postgresql_partition_by": "RANGE (order_created_at)"},
+    )
 
-    id = Column(Integer, primary_key=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # внешнего ключа нет: на секционированную orders можно сослаться только вместе с created_at
+    order_id = Column(Integer, nullable=False, index=True)
+    order_created_at = Column(DateTime, primary_key=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     product_name = Column(String(255), nullable=False)
     variant_info = Column(JSON)
@@ -235,4 +299,166 @@ class OrderItem(Base):
     price = Column(DECIMAL(10, 2), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
 
-    order = relationship("Order", back_populates="items")
+    order = relationship("Order", back_populates="items", primaryjoin=ORDER_ITEMS_JOIN)
+
+    __mapper_args__ = {"primary_key": [id]}
+
+
+
+# ============================================
+# PAYMENT OUTBOX
+# ============================================
+
+class PaymentOutbox(Base):
+    """Платежи к созданию у провайдера; пишутся в одной транзакции с заказом."""
+    __tablename__ = "payment_outbox"
+    __table_args__ = (
+        Index("ix_payment_outbox_pending", "next_attempt_at", postgresql_where=text("status = 'pending'")),
+    )
+
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, nullable=False)
+    amount = Column(DECIMAL(10, 2), nullable=False)
+    status = Column(String(20), default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, server_default=func.now(), nullable=False)
+    last_error = Column(Text)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+
+# ============================================
+# PAYMENT WEBHOOK EVENTS
+# ============================================
+
+class PaymentWebhookEvent(Base):
+    """Входящие уведомления ЮKassa; повтор того же события отбрасывается
+    уникальным ключом (payment_id, event_type), обработка — фоновым воркером."""
+    __tablename__ = "payment_webhook_events"
+    __table_args__ = (
+        UniqueConstraint("payment_id", "event_type", name="uq_payment_webhook_events_payment_event"),
+        Index("ix_payment_webhook_events_pending", "next_attempt_at", postgresql_where=text("status = 'pending'")),
+    )
+
+    id = Column(Integer, primary_key=True)
+    payment_id = Column(String(100), nullable=False)
+    event_type = Column(String(50), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    status = Column(String(20), default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, server_default=func.now(), nullable=False)
+    last_error = Column(Text)
+    received_at = Column(DateTime, server_default=func.now())
+    processed_at = Column(DateTime)
+
+
+
+# ============================================
+# SALES ROLLUPS
+# ============================================
+
+class SalesDailyRollup(Base):
+    """Дневные итоги продаж магазина.
+
+    Строка дня разбита на несколько shard-ов (order_id % ANALYTICS_ROLLUP_SHARDS),
+    чтобы параллельные заказы одного магазина не ждали блокировку одной строки.
+    При чтении shard-ы суммируются.
+    """
+    __tablename__ = "sales_daily_rollups"
+
+    store_id = Column(Integer, ForeignKey("stores.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    orders_count = Column(Integer, default=0, nullable=False)
+    revenue = Column(DECIMAL(14, 2), default=0, nullable=False)
+    paid_orders_count = Column(Integer, default=0, nullable=False)
+    paid_revenue = Column(DECIMAL(14, 2), default=0, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class ProductSalesDailyRollup(Base):
+    """Дневные итоги по товарам; shard — как в SalesDailyRollup, чтобы заказы
+    одного популярного товара не выстраивались в очередь за одной строкой."""
+    __tablename__ = "product_sales_daily_rollups"
+
+    store_id = Column(Integer, ForeignKey("stores.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    product_name = Column(String(255))
+    quantity = Column(Integer, default=0, nullable=False)
+    revenue = Column(DECIMAL(14, 2), default=0, nullable=False)
+
+
+
+# ============================================
+# IDEMPOTENCY KEYS
+# ============================================
+
+class IdempotencyKey(Base):
+    """Ключи Idempotency-Key и сохранённые ответы на них.
+
+    Пока status_code пуст, запрос с этим ключом ещё выполняется; locked_until
+    ограничивает, сколько «висящий» ключ может блокировать повторы.
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+    key = Column(String(300), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer)
+    response_body = Column(JSONB)
+    locked_until = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+
+
+# ============================================
+# RATE LIMITS
+# ============================================
+
+class RateLimitBucket(Base):
+    """Общие для всех реплик token bucket-ы (RATE_LIMIT_BACKEND=postgres).
+
+    Таблица UNLOGGED: после сбоя счётчики просто обнулятся.
+    """
+    __tablename__ = "rate_limit_buckets"
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    key = Column(String(320), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+
+
+# ============================================
+# MEDIA
+# ============================================
+
+class MediaFile(Base):
+    """Загруженный файл, адресуемый по sha256 содержимого.
+
+    path — путь относительно MEDIA_ROOT вида ab/cd/<sha256><расширение>;
+    ref_count — сколько раз эти байты загружали (повтор не пишет файл заново).
+    """
+    __tablename__ = "media_files"
+
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String(255), nullable=False)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String(100))
+    ref_count = Column(Integer, default=1, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+
+class MediaAlias(Base):
+    """Старые плоские имена файлов (<uuid>.jpg) после переноса в media_files —
+    по ним продолжают открываться ссылки, уже сохранённые в товарах и витринах."""
+    __tablename__ = "media_aliases"
+
+    name = Column(String(255), primary_key=True)
+    sha256 = Column(String(64), ForeignKey("media_files.sha256"), nullable=False)
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
@@ -14,9 +15,36 @@ from app.routers.orders import router as orders_router
 from app.routers.media import router as media_router
 from app.routers.public import router as public_router
 from app.routers.yookassa_payment_webhook import router as webhook_router
+from app.routers.analytics import router as analytics_router
+from app.routers.metrics import router as metrics_router
 from app.config import settings
+from app.services.payment_outbox_service import payment_outbox_worker
+from app.services.payment_webhook_service import payment_webhook_worker
+from app.services.idempotency_service import idempotency_key_janitor
+from app.services.order_partition_service import order_partition_maintainer
+from app.services.email_service import mail_queue
+from app.services.media_service import MULTIPART_OVERHEAD, UploadSizeLimitMiddleware
+from app.services import yookassa_payment_service
 
-app = FastAPI(title="Shoplite")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await yookassa_payment_service.start_client()
+    payment_outbox_worker.start()
+    payment_webhook_worker.start()
+    idempotency_key_janitor.start()
+    order_partition_maintainer.start()
+    mail_queue.start()
+    yield
+    await mail_queue.stop()
+    await order_partition_maintainer.stop()
+    await idempotency_key_janitor.stop()
+    await payment_webhook_worker.stop()
+    await payment_outbox_worker.stop()
+    await yookassa_payment_service.close_client()
+
+
+app = FastAPI(title="Shoplite", lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",  
@@ -24,12 +52,20 @@ origins = [
     "*",                      
 ]
 
+# добавлен раньше CORS, чтобы ответ 413 тоже прошёл через CORSMiddleware
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    path_prefix="/v1/api/media/upload",
+    max_bytes=settings.MEDIA_MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD,
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Idempotent-Replayed"],
 )
 
 app.include_router(auth_router, prefix="/v1/api")
@@ -44,6 +80,8 @@ app.include_router(orders_router, prefix="/v1/api")
 app.include_router(media_router, prefix="/v1/api")
 app.include_router(public_router, prefix="/v1/api")
 app.include_router(webhook_router, prefix="/v1/api")
+app.include_router(analytics_router, prefix="/v1/api")
+app.include_router(metrics_router, prefix="/v1/api")
 
 upload_dir = Path(settings.MEDIA_ROOT).resolve()
 upload_dir.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,87 @@
+import asyncio
+from datetime import date, timedelta
+
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy import Date, DateTime, cast, literal_column, select
+from sqlalchemy.sql import func
+
+from app.database import ProductSalesDailyRollup, SalesDailyRollup, fetch_all
+from app.schemas.analytics import SalesAnalyticsOut, SalesBucketOut, TopProductOut
+
+router = APIRouter(tags=["Analytics"])
+
+
+@router.get("/stores/{store_id}/analytics", response_model=SalesAnalyticsOut)
+async def get_sales_analytics(
+    store_id: int,
+    period: str = Query("day", pattern="^(day|week|month)$"),
+    date_from: date | None = None,
+    date_to: date | None = None,
+    top: int = Query(10, ge=1, le=100),
+):
+    """Выручка, число заказов, средний чек и топ товаров по дням/неделям/месяцам.
+
+    Читает только таблицы дневных итогов, заказы не сканируются. date_to включительно.
+    """
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=30)
+    if date_from > date_to:
+        raise HTTPException(400, "date_from must not be after date_to")
+
+    # period проверен регуляркой; литерал вместо параметра, чтобы выражение в GROUP BY совпало с SELECT
+    bucket = cast(func.date_trunc(literal_column(f"'{period}'"), cast(SalesDailyRollup.day, DateTime)), Date).label("bucket")
+    sales_stmt = (
+        select(
+            bucket,
+            func.sum(SalesDailyRollup.orders_count),
+            func.sum(SalesDailyRollup.revenue),
+            func.sum(SalesDailyRollup.paid_orders_count),
+            func.sum(SalesDailyRollup.paid_revenue),
+        )
+        .where(
+            SalesDailyRollup.store_id == store_id,
+            SalesDailyRollup.day >= date_from,
+            SalesDailyRollup.day <= date_to,
+        )
+        .group_by(bucket)
+        .order_by(bucket)
+    )
+    revenue = func.sum(ProductSalesDailyRollup.revenue)
+    top_stmt = (
+        select(
+            ProductSalesDailyRollup.product_id,
+            func.max(ProductSalesDailyRollup.product_name),
+            func.sum(ProductSalesDailyRollup.quantity),
+            revenue,
+        )
+        .where(
+            ProductSalesDailyRollup.store_id == store_id,
+            ProductSalesDailyRollup.day >= date_from,
+            ProductSalesDailyRollup.day <= date_to,
+        )
+        .group_by(ProductSalesDailyRollup.product_id)
+        .order_by(revenue.desc())
+        .limit(top)
+    )
+    sales, top_products = await asyncio.gather(fetch_all(sales_stmt), fetch_all(top_stmt))
+
+    return SalesAnalyticsOut(
+        period=period,
+        date_from=date_from,
+        date_to=date_to,
+        buckets=[
+            SalesBucketOut(
+                period_start=period_start,
+                orders_count=orders_count,
+                revenue=revenue_sum,
+                average_order_value=revenue_sum / orders_count if orders_count else None,
+                paid_orders_count=paid_count,
+                paid_revenue=paid_revenue,
+            )
+            for period_start, orders_count, revenue_sum, paid_count, paid_revenue in sales
+        ],
+        top_products=[
+            TopProductOut(product_id=product_id, product_name=name, quantity=quantity, revenue=product_revenue)
+            for product_id, name, quantity, product_revenue in top_products
+        ],
+    )
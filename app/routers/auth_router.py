@@ -1,22 +1,27 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.user import UserCreate, UserLogin, Token, UserOut, RefreshToken
 from app.database import get_db
 from app.services.auth_service import AuthService
+from app.services.rate_limit_service import auth_rate_limiter
 from app.schemas.user import EmailSchema, ResetPassword
-from app.database import User
+from app.services.auth_cache import CurrentUser
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 @router.post("/register", response_model=Token)
-async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
+async def register(user: UserCreate, request: Request, db: AsyncSession = Depends(get_db)):
+    await auth_rate_limiter.check(request.client.host, user.email)
     new_user = await AuthService.register_user(user.email, user.password, user.name, db)
-    access_token, refresh_token = await AuthService.authenticate(user.email, user.password, db)
+    # пароль только что захэширован, повторная проверка через authenticate не нужна
+    access_token, refresh_token = AuthService.issue_tokens(new_user)
     return Token(access_token=access_token, refresh_token=refresh_token)
 
 @router.post("/login", response_model=Token)
-async def login(user: UserLogin, db: AsyncSession = Depends(get_db)):
+async def login(user: UserLogin, request: Request, db: AsyncSession = Depends(get_db)):
+    # лимит проверяется до запроса в БД и bcrypt
+    await auth_rate_limiter.check(request.client.host, user.email)
     access_token, refresh_token = await AuthService.authenticate(user.email, user.password, db)
     return Token(access_token=access_token, refresh_token=refresh_token)
 
@@ -26,15 +31,17 @@ async def refresh_tokens(data: RefreshToken, db: AsyncSession = Depends(get_db))
     return Token(access_token=access_token, refresh_token=refresh_token)
 
 @router.get("/me", response_model=UserOut)
-async def get_me(current_user: User = Depends(AuthService.get_current_user)):
+async def get_me(current_user: CurrentUser = Depends(AuthService.get_current_user)):
     return current_user
 
 @router.post("/forgot")
-async def forgot(email: EmailSchema, db: AsyncSession = Depends(get_db)):
+async def forgot(email: EmailSchema, request: Request, db: AsyncSession = Depends(get_db)):
+    await auth_rate_limiter.check(request.client.host, email.email)
     await AuthService.forgot_password(email.email, db)
     return {"message": "If this email exists, reset link was sent"}
 
 @router.post("/reset")
-async def reset_password(data: ResetPassword, db: AsyncSession = Depends(get_db)):
+async def reset_password(data: ResetPassword, request: Request, db: AsyncSession = Depends(get_db)):
+    await auth_rate_limiter.check(request.client.host)
     await AuthService.reset_password(data.token, data.new_password, db)
     return {"message": "Password successfully updated"}
@@ -1,8 +1,15 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.database import StoreDesign, Store, get_db
 from app.schemas.design import StoreDesignUpdate, StoreDesignOut
+from app.services.storefront_service import (
+    build_published_store,
+    storefront_cache,
+    write_storefront_artifacts,
+)
 
 router = APIRouter(prefix="/store-design", tags=["Store Design"])
 
@@ -44,6 +51,7 @@ async def update_design(store_id: int, payload: StoreDesignUpdate, db: AsyncSess
             store_row.logo_url = store_logo
 
     await db.commit()
+    storefront_cache.invalidate_store(store_id)
     await db.refresh(design)
     return design
 
@@ -61,5 +69,11 @@ async def publish_design(store_id: int, db: AsyncSession = Depends(get_db)):
         design.version = (design.version or 0) + 1
 
     await db.commit()
+    storefront_cache.invalidate_store(store_id)
     await db.refresh(design)
+
+    # статический снимок витрины: отдаётся без БД через /public/{slug}/static
+    store = await db.get(Store, store_id)
+    if store and store.slug:
+        await asyncio.to_thread(write_storefront_artifacts, build_published_store(store, design))
     return design
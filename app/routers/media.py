@@ -1,44 +1,61 @@
-import os
-import uuid
 from pathlib import Path
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
 from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 import mimetypes
 
 from app.config import settings
+from app.database import get_db
 from app.services.auth_service import AuthService
+from app.services.media_service import (
+    SHARDED_NAME,
+    UploadTooLarge,
+    normalize_suffix,
+    resolve_legacy_name,
+    store_media,
+)
 
 router = APIRouter(prefix="/media", tags=["Media"])
 
+# имя файла — хэш содержимого, поэтому по одному URL всегда одни и те же байты
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
 
 @router.post("/upload")
 async def upload_image(
     file: Annotated[UploadFile, File(...)],
     current_user=Depends(AuthService.get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Only image uploads are allowed")
 
-    suffix = Path(file.filename or "").suffix or ".jpg"
-    filename = f"{uuid.uuid4().hex}{suffix}"
-    upload_dir = Path(settings.MEDIA_ROOT)
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    dest_path = upload_dir / filename
-
-    contents = await file.read()
-    with open(dest_path, "wb") as out:
-        out.write(contents)
+    # повторная загрузка тех же байтов возвращает уже сохранённый файл, второй копии не появляется
+    try:
+        stored = await store_media(db, file.file, normalize_suffix(file.filename), file.content_type)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="File is too large")
 
     # Статическая раздача /uploads может быть недоступна за прокси,
     # поэтому отдаём API-путь, который точно проходит: /v1/api/media/upload/{filename}
-    api_path = f"/v1/api/media/upload/{filename}"
-    return {"url": api_path, "filename": filename}
+    api_path = f"/v1/api/media/upload/{stored.path}"
+    return {
+        "url": api_path,
+        "filename": stored.path,
+        "size": stored.size,
+        "sha256": stored.sha256,
+        "deduplicated": stored.deduplicated,
+    }
 
 
-@router.get("/upload/{filename}")
+@router.get("/upload/{filename:path}")
 async def get_uploaded_image(filename: str):
+    sharded = bool(SHARDED_NAME.match(filename))
+    if not sharded and "/" in filename:
+        raise HTTPException(status_code=400, detail="Invalid path")
+
     upload_dir = Path(settings.MEDIA_ROOT)
     file_path = (upload_dir / filename).resolve()
     try:
@@ -46,8 +63,15 @@ async def get_uploaded_image(filename: str):
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid path")
 
+    if not sharded and not file_path.exists():
+        # старое плоское имя: файл мог быть перенесён командой migrate_media
+        moved = await resolve_legacy_name(filename)
+        if moved:
+            file_path, sharded = upload_dir / moved, True
+
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
 
     media_type, _ = mimetypes.guess_type(str(file_path))
-    return FileResponse(str(file_path), media_type=media_type or "application/octet-stream")
+    headers = {"Cache-Control": IMMUTABLE_CACHE} if sharded else None
+    return FileResponse(str(file_path), media_type=media_type or "application/octet-stream", headers=headers)
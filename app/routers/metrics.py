@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+
+from app.services import yookassa_payment_service
+from app.services.auth_cache import auth_cache
+from app.services.email_service import mail_queue
+from app.services.rate_limit_service import auth_rate_limiter
+from app.services.security_service import hash_queue_depth
+from app.services.storefront_service import storefront_cache
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("/")
+async def get_metrics():
+    """Счётчики процесса: кэши, очередь хэширования паролей, лимиты входа, почта, вызовы ЮKassa.
+
+    Значения у каждого воркера uvicorn свои.
+    """
+    return {
+        "auth_cache": auth_cache.stats(),
+        "storefront_cache": storefront_cache.stats(),
+        "password_hash_in_flight": hash_queue_depth(),
+        "auth_rate_limits": auth_rate_limiter.stats(),
+        "mail_queue": mail_queue.stats(),
+        "yookassa": {
+            "breaker": yookassa_payment_service.breaker.state,
+            "calls": yookassa_payment_service.metrics.snapshot(),
+        },
+    }
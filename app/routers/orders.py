@@ -1,17 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException
+from collections import defaultdict
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.database import Order, OrderItem, get_db
+from sqlalchemy import Integer, any_, bindparam, case, column, func, insert, or_, select, update, values
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm.attributes import set_committed_value
+from app.config import settings
+from app.database import Order, OrderItem, PaymentOutbox, Product, get_db
 from app.schemas.order import OrderCreate, OrderOut
-from app.services.yookassa_payment_service import create_payment
+from app.services.analytics_service import record_order_created
+from app.services.export_service import stream_orders
+from app.services.idempotency_service import (
+    claim_idempotency_key,
+    idempotency_lock,
+    release_idempotency_key,
+    request_fingerprint,
+    store_idempotent_response,
+)
+from app.services.pagination import keyset_paginate, page_with_cursor
+from app.services.payment_outbox_service import payment_outbox_worker
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
 
+ORDER_PAGE_COLUMNS = [Order.created_at, Order.id]
+
+
 @router.get("/store/{store_id}", response_model=list[OrderOut])
-async def get_orders(store_id: int, db: AsyncSession = Depends(get_db)):
-    rows = await db.execute(select(Order).where(Order.store_id == store_id))
-    return rows.scalars().all()
+async def get_orders(
+    store_id: int,
+    response: Response,
+    status: str | None = None,
+    payment_status: str | None = None,
+    customer_email: str | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    limit: int | None = Query(None, ge=1, le=settings.ORDERS_MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Заказы магазина, новые сверху; курсор следующей страницы — в заголовке X-Next-Cursor."""
+    limit = limit or settings.ORDERS_PAGE_SIZE
+    query = select(Order).where(Order.store_id == store_id)
+    if status:
+        query = query.where(Order.status == status)
+    if payment_status:
+        query = query.where(Order.payment_status == payment_status)
+    if customer_email:
+        query = query.where(func.lower(Order.customer_email) == customer_email.lower())
+    if date_from:
+        query = query.where(Order.created_at >= date_from)
+    if date_to:
+        query = query.where(Order.created_at < date_to)
+    query = keyset_paginate(query, ORDER_PAGE_COLUMNS, cursor, limit, descending=True)
+
+    rows = await db.execute(query)
+    orders, next_cursor = page_with_cursor(list(rows.scalars().all()), ORDER_PAGE_COLUMNS, limit)
+    await _attach_items(db, orders)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return orders
+
+
+@router.get("/store/{store_id}/export")
+async def export_orders(store_id: int, fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$")):
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_orders(store_id, fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="orders-{store_id}.{fmt}"'},
+    )
 
 
 @router.get("/{order_id}", response_model=OrderOut)
@@ -19,65 +79,175 @@ async def get_order(order_id: int, db: AsyncSession = Depends(get_db)):
     row = await db.get(Order, order_id)
     if not row:
         raise HTTPException(404, "Order not found")
+    await _attach_items(db, [row])
     return row
 
 
+async def _attach_items(db: AsyncSession, orders: list[Order]) -> None:
+    """Догружает позиции заказов одним запросом.
+
+    Диапазон по order_created_at позволяет Postgres прочитать только секции
+    order_items за месяцы этих заказов, а не все подряд, как сделал бы selectinload.
+    """
+    if not orders:
+        return
+    created = [order.created_at for order in orders]
+    stmt = (
+        select(OrderItem)
+        .where(
+            OrderItem.order_id == any_(bindparam("order_ids", [order.id for order in orders], type_=ARRAY(Integer))),
+            OrderItem.order_created_at.between(min(created), max(created)),
+        )
+        .order_by(OrderItem.id)
+    )
+    by_order = defaultdict(list)
+    for item in (await db.scalars(stmt)).all():
+        by_order[item.order_id].append(item)
+    for order in orders:
+        set_committed_value(order, "items", by_order[order.id])
+
+
+async def _load_catalog_items(db: AsyncSession, store_id: int, product_ids: list[int]) -> dict:
+    # один запрос с массивом вместо IN (...) — одинаковый текст для любого числа позиций
+    stmt = select(Product.id, Product.name, Product.price, Product.status).where(
+        Product.id == any_(bindparam("ids", product_ids, type_=ARRAY(Integer))),
+        Product.store_id == store_id,
+    )
+    catalog = {row.id: row for row in (await db.execute(stmt)).all()}
+
+    missing = sorted(set(product_ids) - set(catalog))
+    if missing:
+        raise HTTPException(404, {"message": "Products not found", "product_ids": missing})
+    # черновики и архивные товары на витрине не видны и купить их нельзя
+    unavailable = sorted(pid for pid, row in catalog.items() if row.status != "active")
+    if unavailable:
+        raise HTTPException(400, {"message": "Products are not available for sale", "product_ids": unavailable})
+    return catalog
+
+
+async def _reserve_stock(db: AsyncSession, store_id: int, quantities: dict[int, int]) -> None:
+    """Списывает остатки всех позиций одним условным UPDATE.
+
+    Строка обновляется, только если остатка хватает, поэтому гонка двух
+    покупателей за последний товар решается самим Postgres без SELECT FOR UPDATE
+    на весь заказ. Строки блокируются в порядке id, чтобы параллельные заказы
+    с одинаковыми товарами не ловили дедлок. Товары с hasLimit=false не ограничены.
+    """
+    requested = values(column("id", Integer), column("qty", Integer), name="requested").data(
+        sorted(quantities.items())
+    )
+    unlimited = Product.variants["hasLimit"].astext == "false"
+    lock_in_order = (
+        select(Product.id)
+        .where(Product.id == any_(bindparam("lock_ids", list(quantities), type_=ARRAY(Integer))))
+        .order_by(Product.id)
+        .with_for_update()
+    )
+    stmt = (
+        update(Product.__table__)
+        .where(
+            Product.id == requested.c.id,
+            Product.store_id == store_id,
+            Product.id.in_(lock_in_order),
+            or_(unlimited, Product.stock >= requested.c.qty),
+        )
+        .values(stock=case((unlimited, Product.stock), else_=Product.stock - requested.c.qty))
+        .returning(Product.id)
+    )
+    reserved = set((await db.execute(stmt)).scalars().all())
+
+    short = sorted(set(quantities) - reserved)
+    if short:
+        await db.rollback()
+        raise HTTPException(409, {"message": "Not enough stock", "product_ids": short})
+
+
 @router.post("/", response_model=OrderOut)
-async def create_order(payload: OrderCreate, db: AsyncSession = Depends(get_db)):
+async def create_order(
+    payload: OrderCreate,
+    idempotency_key: str | None = Header(None, max_length=255),
+    db: AsyncSession = Depends(get_db),
+):
+    """Оформление заказа; с заголовком Idempotency-Key повтор возвращает исходный ответ.
+
+    Дубликаты внутри процесса ждут первый запрос на замке, дубликат с другой
+    реплики, пока первый не закончен, получает 409. При ошибке ключ
+    освобождается, чтобы клиент мог повторить запрос.
+    """
+    if not idempotency_key:
+        return await _create_order(db, payload)
+
+    key = f"orders:{idempotency_key}"
+    async with idempotency_lock(key):
+        stored = await claim_idempotency_key(key, request_fingerprint(payload))
+        if stored is not None:
+            return JSONResponse(stored.body, status_code=stored.status_code, headers={"Idempotent-Replayed": "true"})
+        try:
+            return await _create_order(db, payload, idempotency_key=key)
+        except Exception:
+            await release_idempotency_key(key)
+            raise
+
+
+async def _create_order(db: AsyncSession, payload: OrderCreate, idempotency_key: str | None = None) -> Order:
+    """Оформление заказа одной транзакцией.
+
+    Порядок важен: сначала без блокировок читаем каталог и пишем заказ
+    (INSERT ... RETURNING) и позиции (один многострочный INSERT), затем
+    списываем остатки и только после них обновляем дневные итоги
+    (шардированные строки) перед COMMIT — так блокировки горячих товаров
+    держатся минимально возможное время, а строки итогов не ждут резерва.
+    """
     # TODO проверку на возможность оплаты (продавец указал shop_id и secret_key магазина Юкассы)
     # как минимум на фронт проверку точно надо
+    if not payload.items:
+        raise HTTPException(400, "Order has no items")
 
-    order = Order(
-        store_id=payload.store_id,
-        customer_email=payload.customer_email,
-        customer_name=payload.customer_name,
-        customer_phone=payload.customer_phone,
-        shipping_address=payload.shipping_address,
-        billing_address=payload.billing_address,
-        total_amount=payload.total_amount,
-        status="pending",
-        payment_status="unpaid",
-    )
-    db.add(order)
-    await db.commit()
-    await db.refresh(order)
+    quantities: dict[int, int] = {}
+    for item in payload.items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
 
-    total_price = 0.0
+    # цены и названия берём из БД, присланные клиентом игнорируем
+    catalog = await _load_catalog_items(db, payload.store_id, list(quantities))
+    total_price = sum(catalog[item.product_id].price * item.quantity for item in payload.items)
 
-    for item in payload.items:
-        db.add(OrderItem(
-            order_id=order.id,
-            product_id=item.product_id,
-            product_name=item.product_name,
-            variant_info=item.variant_info,
-            quantity=item.quantity,
-            price=item.price
-        ))
-        total_price += item.quantity * item.price
+    order = (await db.scalars(insert(Order).returning(Order), [{
+        "store_id": payload.store_id,
+        "customer_email": payload.customer_email,
+        "customer_name": payload.customer_name,
+        "customer_phone": payload.customer_phone,
+        "shipping_address": payload.shipping_address,
+        "billing_address": payload.billing_address,
+        "total_amount": total_price,
+        "status": "pending",
+        "payment_status": "unpaid",
+    }])).one()
 
-    await db.commit()
+    items = (await db.scalars(insert(OrderItem).returning(OrderItem), [
+        {
+            "order_id": order.id,
+            "order_created_at": order.created_at,
+            "product_id": item.product_id,
+            "product_name": catalog[item.product_id].name,
+            "variant_info": item.variant_info,
+            "quantity": item.quantity,
+            "price": catalog[item.product_id].price,
+        }
+        for item in payload.items
+    ])).all()
+    set_committed_value(order, "items", list(items))
 
-    payment_id = await _create_yookassa_payment(order.id, total_price)
-    # TODO сохранить payment_id в Order
+    # платёж создаст фоновый воркер; запись outbox коммитится вместе с заказом
+    db.add(PaymentOutbox(order_id=order.id, amount=total_price))
 
-    return order
+    if idempotency_key:
+        body = OrderOut.model_validate(order, from_attributes=True).model_dump(mode="json")
+        await store_idempotent_response(db, idempotency_key, 200, body)
 
-async def _create_yookassa_payment(order_id: int, total_price: float):
-    shop_id = 'shop_id' # TODO вытаскиваем эту инфу из данных магазина
-    secret_key = 'secret_key' # TODO вытаскиваем эту инфу из данных магазина
-    payment_data = {
-        "amount": {
-            "value": f"{round(total_price, 2)}",
-            "currency": "RUB" # TODO хорошо бы учитывать, в какой валюте будет платить клиент, но на данном этапе не важно
-        },
-        "capture": True,
-        "confirmation": {
-            "type": "redirect",
-            "return_url": "https://example.com/thank-you-page" # TODO url редиректа после оплаты
-        },
-        "description": f"Заказ №{order_id}", # TODO нормальное описание заказа
-        "metadata": {
-            "order_id": order_id
-        }
-    }
-    return await create_payment(shop_id, secret_key, payment_data)
\ No newline at end of file
+    await _reserve_stock(db, payload.store_id, quantities)
+    # итоги пишутся после резерва: их строки не блокируются, пока заказ ждёт остатки
+    await record_order_created(db, order, items)
+    await db.commit()
+    payment_outbox_worker.notify()
+
+    return order
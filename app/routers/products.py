@@ -1,12 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+import asyncio
+import csv
+import io
+import itertools
+import json
+import re
+from decimal import Decimal
+from pathlib import Path
+from typing import Annotated, Iterator
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import Integer, and_, case, column, delete, literal_column, or_, select, update, values
+from sqlalchemy.dialects.postgresql import JSONB, aggregate_order_by, insert as pg_insert
+from sqlalchemy.exc import DBAPIError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
 
-from app.database import Product, get_db
-from app.schemas.product import ProductCreate, ProductForm, ProductOut
+from app.config import settings
+from app.database import Category, CollectionProduct, Product, Store, get_db
+from app.schemas.product import (
+    FacetValue,
+    PriceRange,
+    ProductBulkFilter,
+    ProductBulkPrice,
+    ProductBulkResult,
+    ProductBulkStatus,
+    ProductBulkStock,
+    ProductCreate,
+    ProductFacets,
+    ProductFilterOut,
+    ProductForm,
+    ProductImportError,
+    ProductImportReport,
+    ProductOut,
+)
+from app.services.export_service import stream_products
+from app.services.pagination import keyset_paginate, page_with_cursor
 
 router = APIRouter(tags=["Products"])
 
+# sort -> (колонки keyset-курсора, по убыванию)
+PRODUCT_SORTS = {
+    "created_at": ([Product.created_at, Product.id], False),
+    "-created_at": ([Product.created_at, Product.id], True),
+    "price": ([Product.price, Product.id], False),
+    "-price": ([Product.price, Product.id], True),
+}
+PRODUCT_FIELDS = set(ProductOut.model_fields) & set(Product.__table__.c.keys())
+
+# колонки, которые заполняет импорт; у всех строк пачки одинаковый набор ключей
+IMPORT_COLUMNS = [
+    "store_id", "category_id", "name", "description", "price", "compare_at_price", "sku",
+    "barcode", "stock", "status", "images", "variants", "meta_title", "meta_description",
+]
+IMPORT_MAX_ERRORS = 1000
+
 
 async def _get_product(db: AsyncSession, prod_id: int, store_id: int | None = None) -> Product:
     product = await db.get(Product, prod_id)
@@ -38,16 +88,214 @@ def _prepare_product_data(store_id: int, payload: dict) -> dict:
     return data
 
 
+def _parse_fields(fields: str, sort_columns: list) -> list:
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - PRODUCT_FIELDS
+    if unknown:
+        raise HTTPException(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+    # колонки курсора нужны всегда, иначе не из чего собрать следующий курсор
+    requested.update(c.key for c in sort_columns)
+    return [Product.__table__.c[name] for name in sorted(requested)]
+
+
 @router.get("/products/store/{store_id}", response_model=list[ProductOut])
 @router.get("/stores/{store_id}/products", response_model=list[ProductOut])
-async def get_products(store_id: int, status: str = "all", db: AsyncSession = Depends(get_db)):
-    query = select(Product).where(Product.store_id == store_id)
+async def get_products(
+    store_id: int,
+    response: Response,
+    status: str = "all",
+    sort: str = "created_at",
+    limit: int | None = Query(None, ge=1, le=settings.PRODUCTS_MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    fields: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Страница товаров магазина; курсор следующей страницы — в заголовке X-Next-Cursor.
+
+    fields=id,name,price выбирает из БД только перечисленные колонки.
+    """
+    if sort not in PRODUCT_SORTS:
+        raise HTTPException(400, f"Unsupported sort, use one of: {', '.join(PRODUCT_SORTS)}")
+    sort_columns, descending = PRODUCT_SORTS[sort]
+    limit = limit or settings.PRODUCTS_PAGE_SIZE
+
+    columns = _parse_fields(fields, sort_columns) if fields else None
+    query = select(*columns) if columns else select(Product)
+    query = query.where(Product.store_id == store_id)
     if status != "all":
         query = query.where(Product.status == status)
+    query = keyset_paginate(query, sort_columns, cursor, limit, descending)
+
+    rows = await db.execute(query)
+    items, next_cursor = page_with_cursor(list(rows.all() if columns else rows.scalars().all()), sort_columns, limit)
+
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if columns:
+        return JSONResponse(jsonable_encoder([dict(r._mapping) for r in items]), headers=headers)
+    response.headers.update(headers)
+    return items
+
+
+def _prefix_tsquery(q: str) -> str | None:
+    # каждое слово запроса ищется как префикс: "крас фут" -> "крас:* & фут:*"
+    terms = re.findall(r"\w+", q.lower())
+    return " & ".join(f"{term}:*" for term in terms) or None
+
+
+@router.get("/stores/{store_id}/products/search", response_model=list[ProductOut])
+async def search_products(
+    store_id: int,
+    q: str = Query(..., min_length=1),
+    status: str = "active",
+    limit: int | None = Query(None, ge=1, le=settings.PRODUCTS_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    """Полнотекстовый поиск по товарам магазина с ранжированием по релевантности."""
+    tsquery = _prefix_tsquery(q)
+    if not tsquery:
+        return []
+
+    ts_query = func.to_tsquery("simple", tsquery)
+    query = select(Product).where(Product.store_id == store_id, Product.search_vector.op("@@")(ts_query))
+    if status != "all":
+        query = query.where(Product.status == status)
+    query = (
+        query.order_by(func.ts_rank_cd(Product.search_vector, ts_query).desc(), Product.id.desc())
+        .offset(offset)
+        .limit(limit or settings.PRODUCTS_PAGE_SIZE)
+    )
     rows = await db.execute(query)
     return rows.scalars().all()
 
 
+def _category_subtree(category_id: int):
+    tree = select(Category.id).where(Category.id == category_id).cte("category_tree", recursive=True)
+    tree = tree.union_all(select(Category.id).where(Category.parent_id == tree.c.id))
+    return select(tree.c.id)
+
+
+def _variant_condition(attribute: str, options: list[str]):
+    # @> по jsonb попадает в GIN-индекс ix_products_variants
+    return or_(*[Product.variants.contains({attribute: option}) for option in options])
+
+
+def _variant_facet(attribute: str, conditions: list):
+    value = Product.variants[attribute].astext
+    return (
+        select(value.label("value"), func.count().label("count"))
+        .where(*conditions, Product.variants.has_key(attribute))
+        .group_by(value)
+        .order_by(func.count().desc())
+    )
+
+
+def _facet_values(facet):
+    """Строки фасета (value, count) одним jsonb-массивом, чтобы все фасеты уложились в один SELECT."""
+    facet = facet.subquery()
+    pair = func.jsonb_build_array(facet.c.value, facet.c.count)
+    return select(
+        func.coalesce(func.jsonb_agg(aggregate_order_by(pair, facet.c.count.desc())), literal_column("'[]'::jsonb"), type_=JSONB)
+    ).scalar_subquery()
+
+
+@router.get("/stores/{store_id}/products/filter", response_model=ProductFilterOut)
+async def filter_products(
+    store_id: int,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    category_id: int | None = None,
+    collection_id: int | None = None,
+    in_stock: bool | None = None,
+    size: list[str] | None = Query(None),
+    color: list[str] | None = Query(None),
+    status: str = "active",
+    sort: str = "created_at",
+    limit: int | None = Query(None, ge=1, le=settings.PRODUCTS_MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Фильтрация товаров с подсчётом фасетов в одном ответе.
+
+    Счётчики каждого фасета считаются с учётом всех фильтров, кроме его собственного,
+    чтобы на витрине было видно, сколько товаров даст соседнее значение.
+    Страница товаров — один запрос, все счётчики и фасеты — второй (скалярные
+    подзапросы), оба в сессии запроса: на фильтр уходит одно соединение из пула.
+    """
+    if sort not in PRODUCT_SORTS:
+        raise HTTPException(400, f"Unsupported sort, use one of: {', '.join(PRODUCT_SORTS)}")
+    sort_columns, descending = PRODUCT_SORTS[sort]
+    limit = limit or settings.PRODUCTS_PAGE_SIZE
+
+    filters: dict[str, list] = {"base": [Product.store_id == store_id]}
+    if status != "all":
+        filters["base"].append(Product.status == status)
+    if collection_id is not None:
+        filters["base"].append(Product.id.in_(
+            select(CollectionProduct.product_id).where(CollectionProduct.collection_id == collection_id)
+        ))
+    if min_price is not None or max_price is not None:
+        filters["price"] = []
+        if min_price is not None:
+            filters["price"].append(Product.price >= min_price)
+        if max_price is not None:
+            filters["price"].append(Product.price <= max_price)
+    if category_id is not None:
+        filters["category"] = [Product.category_id.in_(_category_subtree(category_id))]
+    if in_stock is not None:
+        filters["in_stock"] = [Product.stock > 0 if in_stock else func.coalesce(Product.stock, 0) <= 0]
+    if size:
+        filters["size"] = [_variant_condition("size", size)]
+    if color:
+        filters["color"] = [_variant_condition("color", color)]
+
+    def conditions(exclude: str | None = None) -> list:
+        return [c for name, group in filters.items() if name != exclude for c in group]
+
+    page = keyset_paginate(select(Product).where(*conditions()), sort_columns, cursor, limit, descending)
+    items = list((await db.scalars(page)).all())
+
+    categories = (
+        select(Product.category_id.label("value"), func.count().label("count"))
+        .where(*conditions("category"), Product.category_id.is_not(None))
+        .group_by(Product.category_id)
+    )
+    facets = (await db.execute(select(
+        select(func.count()).select_from(Product).where(*conditions()).scalar_subquery(),
+        _facet_values(categories),
+        _facet_values(_variant_facet("size", conditions("size"))),
+        _facet_values(_variant_facet("color", conditions("color"))),
+        select(func.min(Product.price)).where(*conditions("price")).scalar_subquery(),
+        select(func.max(Product.price)).where(*conditions("price")).scalar_subquery(),
+        select(func.count()).select_from(Product).where(*conditions("in_stock"), Product.stock > 0).scalar_subquery(),
+    ))).one()
+    total, categories, sizes, colors, low, high, in_stock_count = facets
+    items, next_cursor = page_with_cursor(items, sort_columns, limit)
+
+    return ProductFilterOut(
+        items=[ProductOut.model_validate(p) for p in items],
+        total=total,
+        next_cursor=next_cursor,
+        facets=ProductFacets(
+            categories=[FacetValue(value=cid, count=count) for cid, count in categories],
+            size=[FacetValue(value=value, count=count) for value, count in sizes],
+            color=[FacetValue(value=value, count=count) for value, count in colors],
+            price=PriceRange(min=low, max=high),
+            in_stock=in_stock_count,
+        ),
+    )
+
+
+@router.get("/stores/{store_id}/products/export")
+async def export_products(store_id: int, fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$")):
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_products(store_id, fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="products-{store_id}.{fmt}"'},
+    )
+
+
 @router.get("/products/{prod_id}", response_model=ProductOut)
 async def get_product(prod_id: int, db: AsyncSession = Depends(get_db)):
     return await _get_product(db, prod_id)
@@ -113,3 +361,264 @@ async def delete_store_product(store_id: int, prod_id: int, db: AsyncSession = D
     await db.delete(row)
     await db.commit()
     return {"status": "ok"}
+
+
+def _detect_import_format(file: UploadFile, fmt: str | None) -> str:
+    if fmt:
+        return fmt
+    suffix = Path(file.filename or "").suffix.lower()
+    if suffix in (".ndjson", ".jsonl") or (file.content_type or "").endswith("ndjson"):
+        return "ndjson"
+    return "csv"
+
+
+def _csv_row(raw: dict) -> dict:
+    row = {k.strip(): v for k, v in raw.items() if k and v not in (None, "")}
+    for key in ("images", "variants"):
+        value = row.get(key)
+        if value is None:
+            continue
+        try:
+            row[key] = json.loads(value)
+        except ValueError:
+            if key == "images":
+                row[key] = [part.strip() for part in value.split("|") if part.strip()]
+    return row
+
+
+def _iter_import_rows(file: UploadFile, fmt: str) -> Iterator[tuple[int, dict | Exception]]:
+    """Построчно читает загруженный файл, не поднимая его целиком в память."""
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for row_number, raw in enumerate(csv.DictReader(text), start=2):
+            yield row_number, _csv_row(raw)
+        return
+
+    for row_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+            if not isinstance(raw, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            yield row_number, e
+            continue
+        yield row_number, raw
+
+
+def _import_row(store_id: int, raw: dict) -> tuple[dict, frozenset]:
+    """Строка для INSERT и колонки, которые в ней действительно заданы.
+
+    Пустые ячейки CSV и null в NDJSON считаются незаданными: у существующего
+    SKU такие колонки не меняются, а умолчания stock=0 и status="active"
+    достаются только новым товарам.
+    """
+    form = ProductForm.model_validate(raw)
+    data = _prepare_product_data(store_id, form.model_dump(exclude_unset=True, exclude_none=True))
+    columns = frozenset(data) & frozenset(IMPORT_COLUMNS)
+    row = {column: data.get(column) for column in IMPORT_COLUMNS}
+    if row["stock"] is None:
+        row["stock"] = 0
+    if row["status"] is None:
+        row["status"] = "active"
+    return row, columns
+
+
+def _parse_import(file: UploadFile, fmt: str, store_id: int) -> Iterator[tuple[int, dict | str, frozenset]]:
+    """Чтение, разбор и валидация строк; вместо строки — текст ошибки."""
+    for row_number, raw in _iter_import_rows(file, fmt):
+        if isinstance(raw, Exception):
+            yield row_number, f"Invalid JSON: {raw}", frozenset()
+            continue
+        try:
+            row, columns = _import_row(store_id, raw)
+        except ValidationError as e:
+            yield row_number, _validation_message(e), frozenset()
+            continue
+        yield row_number, row, columns
+
+
+def _take(rows: Iterator, count: int) -> list:
+    return list(itertools.islice(rows, count))
+
+
+def _add_import_error(report: ProductImportReport, row_number: int, message: str) -> None:
+    report.failed += 1
+    if len(report.errors) < IMPORT_MAX_ERRORS:
+        report.errors.append(ProductImportError(row=row_number, error=message))
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+
+
+def _upsert_statement(rows: list[dict], columns: frozenset):
+    stmt = pg_insert(Product).values(rows)
+    # незаданные в строке колонки у существующих товаров не трогаем
+    update_columns = {c: stmt.excluded[c] for c in IMPORT_COLUMNS if c in columns and c != "store_id"}
+    if "variants" in update_columns:
+        # size/color/hasLimit дописываются к существующим вариантам, а не заменяют их целиком
+        both_objects = and_(
+            func.jsonb_typeof(Product.variants) == "object", func.jsonb_typeof(stmt.excluded.variants) == "object"
+        )
+        update_columns["variants"] = case(
+            (both_objects, Product.variants.op("||")(stmt.excluded.variants)), else_=stmt.excluded.variants
+        )
+    update_columns["updated_at"] = func.now()
+    # чужой SKU (другого магазина) не перезаписываем: такая строка просто не вернётся из RETURNING
+    return stmt.on_conflict_do_update(
+        index_elements=[Product.sku],
+        set_=update_columns,
+        where=Product.store_id == stmt.excluded.store_id,
+    ).returning(Product.sku, literal_column("xmax = 0").label("inserted"))
+
+
+async def _flush_import_batch(
+    db: AsyncSession, batch: list[tuple[int, dict]], columns: frozenset, report: ProductImportReport
+) -> None:
+    async def write(rows: list[tuple[int, dict]]):
+        async with db.begin_nested():
+            result = await db.execute(_upsert_statement([row for _, row in rows], columns))
+            returned = result.all()
+        written_skus = {r.sku for r in returned if r.sku is not None}
+        for r in returned:
+            if r.inserted:
+                report.created += 1
+            else:
+                report.updated += 1
+        for row_number, row in rows:
+            if row["sku"] is not None and row["sku"] not in written_skus:
+                _add_import_error(report, row_number, f"SKU {row['sku']} is used by another store")
+
+    try:
+        await write(batch)
+    except DBAPIError:
+        # пачка упала целиком (например, несуществующая категория) — ищем виноватые строки по одной
+        for row_number, row in batch:
+            try:
+                await write([(row_number, row)])
+            except DBAPIError as e:
+                message = str(e.orig).strip().splitlines()
+                _add_import_error(report, row_number, message[0] if message else "Database error")
+
+
+@router.post("/stores/{store_id}/products/import", response_model=ProductImportReport)
+async def import_products(
+    store_id: int,
+    file: Annotated[UploadFile, File(...)],
+    fmt: str | None = Query(None, alias="format", pattern="^(csv|ndjson)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Массовый импорт CSV/NDJSON с upsert по SKU.
+
+    Строки маппятся так же, как в create_store_product, и пишутся пачками
+    многострочным INSERT ... ON CONFLICT. У существующих SKU обновляются
+    только колонки, заданные в строке, а варианты дополняются. Ошибочные строки попадают в отчёт
+    и не мешают остальным. Файл читается и валидируется в потоке, кусками
+    по размеру пачки, чтобы не блокировать event loop.
+    """
+    if not await db.get(Store, store_id):
+        raise HTTPException(404, "Store not found")
+
+    report = ProductImportReport()
+    # у одного INSERT ... ON CONFLICT общий набор обновляемых колонок, поэтому строки
+    # копятся в пачках по этому набору и сбрасываются все вместе
+    batches: dict[frozenset, list[tuple[int, dict]]] = {}
+    pending = 0
+    pending_skus: set[str] = set()
+
+    async def flush() -> None:
+        nonlocal pending
+        for columns, batch in batches.items():
+            await _flush_import_batch(db, batch, columns, report)
+        batches.clear()
+        pending_skus.clear()
+        pending = 0
+
+    rows = _parse_import(file, _detect_import_format(file, fmt), store_id)
+    while parsed := await asyncio.to_thread(_take, rows, settings.PRODUCT_IMPORT_BATCH_SIZE):
+        for row_number, row, columns in parsed:
+            if isinstance(row, str):
+                _add_import_error(report, row_number, row)
+                continue
+
+            # повтор SKU должен примениться после предыдущей строки с ним
+            if row["sku"] and row["sku"] in pending_skus:
+                await flush()
+            batches.setdefault(columns, []).append((row_number, row))
+            pending += 1
+            if row["sku"]:
+                pending_skus.add(row["sku"])
+            if pending >= settings.PRODUCT_IMPORT_BATCH_SIZE:
+                await flush()
+
+    await flush()
+    await db.commit()
+    return report
+
+
+def _bulk_conditions(store_id: int, payload: ProductBulkFilter) -> list:
+    conditions = [Product.store_id == store_id]
+    if payload.ids is not None:
+        conditions.append(Product.id.in_(payload.ids))
+    if payload.category_id is not None:
+        conditions.append(Product.category_id == payload.category_id)
+    return conditions
+
+
+async def _execute_bulk(db: AsyncSession, stmt) -> ProductBulkResult:
+    # ORM-объекты не загружаются и не синхронизируются: один UPDATE/DELETE на запрос
+    result = await db.execute(stmt.execution_options(synchronize_session=False))
+    await db.commit()
+    return ProductBulkResult(affected=result.rowcount)
+
+
+@router.post("/stores/{store_id}/products/bulk/status", response_model=ProductBulkResult)
+async def bulk_update_status(store_id: int, payload: ProductBulkStatus, db: AsyncSession = Depends(get_db)):
+    stmt = update(Product).where(*_bulk_conditions(store_id, payload)).values(status=payload.status)
+    return await _execute_bulk(db, stmt)
+
+
+@router.post("/stores/{store_id}/products/bulk/price", response_model=ProductBulkResult)
+async def bulk_update_price(store_id: int, payload: ProductBulkPrice, db: AsyncSession = Depends(get_db)):
+    if payload.percent is not None:
+        new_price = func.round(Product.price * (1 + Decimal(str(payload.percent)) / 100), 2)
+    elif payload.amount is not None:
+        new_price = Product.price + Decimal(str(payload.amount))
+    else:
+        new_price = Decimal(str(payload.price))
+
+    stmt = update(Product).where(*_bulk_conditions(store_id, payload)).values(price=func.greatest(new_price, 0))
+    return await _execute_bulk(db, stmt)
+
+
+@router.post("/stores/{store_id}/products/bulk/stock", response_model=ProductBulkResult)
+async def bulk_update_stock(store_id: int, payload: ProductBulkStock, db: AsyncSession = Depends(get_db)):
+    if not payload.stock:
+        return ProductBulkResult(affected=0)
+
+    new_stock = values(column("id", Integer), column("stock", Integer), name="new_stock").data(
+        list(payload.stock.items())
+    )
+    stmt = (
+        update(Product.__table__)
+        .where(Product.id == new_stock.c.id, Product.store_id == store_id)
+        .values(stock=new_stock.c.stock)
+    )
+    return await _execute_bulk(db, stmt)
+
+
+@router.post("/stores/{store_id}/products/bulk/delete", response_model=ProductBulkResult)
+async def bulk_delete_products(store_id: int, payload: ProductBulkFilter, db: AsyncSession = Depends(get_db)):
+    conditions = _bulk_conditions(store_id, payload)
+    await db.execute(
+        delete(CollectionProduct)
+        .where(CollectionProduct.product_id.in_(select(Product.id).where(*conditions)))
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        return await _execute_bulk(db, delete(Product).where(*conditions))
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(409, "Some products are referenced by orders, archive them instead")
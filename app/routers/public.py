@@ -1,40 +1,183 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Request, Response
+from fastapi.responses import FileResponse, RedirectResponse
+from pydantic import TypeAdapter
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import Store, StoreDesign, get_db
-from app.schemas.store import PublishedStoreOut
 from app.config import settings
+from app.database import Category, Collection, Product, Store, StoreDesign, fetch_all, get_db
+from app.schemas.category import CategoryTreeOut
+from app.schemas.collection import CollectionOut
+from app.schemas.product import ProductOut
+from app.schemas.store import PublishedStoreOut, StorefrontBootstrapOut
+from app.services.pagination import keyset_paginate, page_with_cursor
+from app.services.storefront_service import (
+    ARTIFACT_ENCODINGS,
+    ARTIFACT_NAME_PATTERN,
+    CachedStorefront,
+    build_published_store,
+    read_current_artifact,
+    storefront_artifact_path,
+    storefront_cache,
+)
 
 router = APIRouter(prefix="/public", tags=["Public"])
 
+# slug попадает в путь на диске, пропускаем только то, что генерирует _prepare_slug
+SLUG_PATTERN = r"^[a-z0-9-]+$"
 
-@router.get("/{slug}", response_model=PublishedStoreOut)
-async def get_published_store(slug: str, db: AsyncSession = Depends(get_db)):
-    store_stmt = select(Store).where(Store.slug == slug)
-    store_row = await db.execute(store_stmt)
-    store = store_row.scalars().first()
-    if not store:
-        raise HTTPException(status_code=404, detail="Store not found")
 
-    design_stmt = select(StoreDesign).where(StoreDesign.store_id == store.id)
-    design_row = await db.execute(design_stmt)
-    design = design_row.scalars().first()
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag or candidate == "*":
+            return True
+    return False
+
+
+def _pick_encoding(accept_encoding: str | None) -> str:
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in ("br", "gzip"):
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+# тот же порядок, что и по умолчанию в get_products, чтобы курсор подходил для догрузки
+PRODUCT_PAGE_COLUMNS = [Product.created_at, Product.id]
+
+_category_tree_adapter = TypeAdapter(list[CategoryTreeOut])
+_collections_adapter = TypeAdapter(list[CollectionOut])
+_products_adapter = TypeAdapter(list[ProductOut])
+
+
+async def _resolve_storefront(db: AsyncSession, slug: str) -> CachedStorefront:
+    entry = storefront_cache.get(slug)
+    if entry is not None:
+        return entry
+
+    stmt = (
+        select(Store, StoreDesign)
+        .outerjoin(StoreDesign, StoreDesign.store_id == Store.id)
+        .where(Store.slug == slug)
+    )
+    row = (await db.execute(stmt)).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Store not found")
+    store, design = row
     if not design or not design.is_published:
         raise HTTPException(status_code=404, detail="Store is not published")
 
-    return PublishedStoreOut(
-        id=store.id,
-        name=store.name,
-        slug=store.slug,
-        description=store.description,
-        color=store.color,
-        logo_url=store.logo_url,
-        domain=store.domain,
-        design_data=design.design_data,
-        theme=design.theme,
-        custom_css=design.custom_css,
-        version=design.version,
-        published=True,
-        published_url=f"{settings.PUBLIC_BASE_URL.rstrip('/')}/s/{store.slug}",
+    return storefront_cache.put(slug, build_published_store(store, design))
+
+
+def _build_category_tree(categories: list[Category]) -> list[CategoryTreeOut]:
+    nodes = {c.id: CategoryTreeOut.model_validate(c, from_attributes=True) for c in categories}
+    roots = []
+    for node in sorted(nodes.values(), key=lambda n: (n.order_index or 0, n.id)):
+        parent = nodes.get(node.parent_id) if node.parent_id else None
+        if parent is not None:
+            parent.children.append(node)
+        else:
+            roots.append(node)
+    return roots
+
+
+@router.get("/{slug}", response_model=PublishedStoreOut)
+async def get_published_store(
+    slug: str,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    entry = await _resolve_storefront(db, slug)
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+@router.get("/{slug}/bootstrap", response_model=StorefrontBootstrapOut)
+async def get_storefront_bootstrap(slug: str, db: AsyncSession = Depends(get_db)):
+    """Всё, что нужно витрине для первой отрисовки, одним ответом."""
+    entry = await _resolve_storefront(db, slug)
+    store_id = entry.store_id
+
+    categories, collections, products = await asyncio.gather(
+        fetch_all(select(Category).where(Category.store_id == store_id), scalars=True),
+        fetch_all(
+            select(Collection)
+            .where(Collection.store_id == store_id, Collection.is_active.is_(True))
+            .order_by(Collection.order_index, Collection.id),
+            scalars=True,
+        ),
+        fetch_all(keyset_paginate(
+            select(Product).where(Product.store_id == store_id, Product.status == "active"),
+            PRODUCT_PAGE_COLUMNS, None, settings.PRODUCTS_PAGE_SIZE,
+        ), scalars=True),
     )
+    products, next_cursor = page_with_cursor(products, PRODUCT_PAGE_COLUMNS, settings.PRODUCTS_PAGE_SIZE)
+
+    # store уже сериализован в кэше, поэтому собираем JSON из готовых кусков
+    body = b"".join([
+        b'{"store":', entry.body,
+        b',"categories":', _category_tree_adapter.dump_json(_build_category_tree(categories)),
+        b',"collections":', _collections_adapter.dump_json(_collections_adapter.validate_python(collections, from_attributes=True)),
+        b',"products":', _products_adapter.dump_json(_products_adapter.validate_python(products, from_attributes=True)),
+        b',"products_next_cursor":', json.dumps(next_cursor).encode(),
+        b"}",
+    ])
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/{slug}/static")
+async def get_static_store(request: Request, slug: str = Path(..., pattern=SLUG_PATTERN)):
+    current = read_current_artifact(slug)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Store is not published")
+    store_id, name = current
+    return RedirectResponse(
+        str(request.url_for("get_static_store_artifact", store_id=store_id, name=name)),
+        status_code=307,
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@router.get("/storefronts/{store_id}/{name}")
+async def get_static_store_artifact(
+    store_id: int,
+    name: str = Path(..., pattern=ARTIFACT_NAME_PATTERN),
+    accept_encoding: str | None = Header(None),
+):
+    encoding = _pick_encoding(accept_encoding)
+    file_path = storefront_artifact_path(store_id, name, encoding)
+    if encoding != "identity" and not file_path.exists():
+        encoding = "identity"
+        file_path = storefront_artifact_path(store_id, name)
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="Store artifact not found")
+
+    headers = {
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Vary": "Accept-Encoding",
+    }
+    if ARTIFACT_ENCODINGS[encoding]:
+        headers["Content-Encoding"] = encoding
+    return FileResponse(str(file_path), media_type="application/json", headers=headers)
@@ -1,9 +1,19 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.database import Store, get_db, User
+from app.database import Store, StoreDesign, get_db
 from app.schemas.store import StoreCreate, StoreOut
+from app.services.auth_cache import CurrentUser
 from app.services.auth_service import AuthService
+from app.services.storefront_service import (
+    build_published_store,
+    remove_storefront_artifacts,
+    storefront_cache,
+    unlink_storefront_slug,
+    write_storefront_artifacts,
+)
 import re
 import uuid
 router = APIRouter(prefix="/stores", tags=["Stores"])
@@ -30,7 +40,7 @@ async def _prepare_slug(db: AsyncSession, name: str, provided_slug: str | None,
 
 @router.get("/", response_model=list[StoreOut])
 async def get_stores(
-    current_user: User = Depends(AuthService.get_current_user),
+    current_user: CurrentUser = Depends(AuthService.get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     rows = await db.execute(
@@ -49,7 +59,7 @@ async def get_store(store_id: int, db: AsyncSession = Depends(get_db)):
 
 @router.post("/", response_model=StoreOut)
 async def create_store(payload: StoreCreate,
-                       current_user: User = Depends(AuthService.get_current_user),
+                       current_user: CurrentUser = Depends(AuthService.get_current_user),
                        db: AsyncSession = Depends(get_db)):
     slug = await _prepare_slug(db, payload.name, payload.slug)
     store = Store(
@@ -73,6 +83,7 @@ async def update_store(store_id: int, payload: StoreCreate, db: AsyncSession = D
     if not store:
         raise HTTPException(404, "Store not found")
 
+    old_slug = store.slug
     data = payload.dict()
     if data.get("slug"):
         store.slug = await _prepare_slug(db, data.get("name") or store.name, data["slug"], exclude_store_id=store.id)
@@ -82,7 +93,15 @@ async def update_store(store_id: int, payload: StoreCreate, db: AsyncSession = D
         setattr(store, key, value)
 
     await db.commit()
+    storefront_cache.invalidate_store(store.id)
     await db.refresh(store)
+
+    # старый slug больше не должен вести на витрину, а снимок — содержать старые данные
+    if old_slug and old_slug != store.slug:
+        await asyncio.to_thread(unlink_storefront_slug, store.id, old_slug)
+    design = (await db.execute(select(StoreDesign).where(StoreDesign.store_id == store.id))).scalar()
+    if design and design.is_published and store.slug:
+        await asyncio.to_thread(write_storefront_artifacts, build_published_store(store, design))
     return store
 
 
@@ -92,6 +111,9 @@ async def delete_store(store_id: int, db: AsyncSession = Depends(get_db)):
     if not row:
         raise HTTPException(404, "Store not found")
 
+    slug = row.slug
     await db.delete(row)
     await db.commit()
+    storefront_cache.invalidate_store(store_id)
+    await asyncio.to_thread(remove_storefront_artifacts, store_id, slug)
     return {"status": "ok"}
@@ -0,0 +1,28 @@
+from datetime import date
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class SalesBucketOut(BaseModel):
+    period_start: date
+    orders_count: int
+    revenue: float
+    average_order_value: Optional[float] = None
+    paid_orders_count: int
+    paid_revenue: float
+
+
+class TopProductOut(BaseModel):
+    product_id: int
+    product_name: Optional[str] = None
+    quantity: int
+    revenue: float
+
+
+class SalesAnalyticsOut(BaseModel):
+    period: str
+    date_from: date
+    date_to: date
+    buckets: List[SalesBucketOut] = []
+    top_products: List[TopProductOut] = []
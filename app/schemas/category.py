@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 
 class CategoryBase(BaseModel):
@@ -20,3 +20,7 @@ class CategoryOut(CategoryBase):
 
     class Config:
         orm_mode = True
+
+
+class CategoryTreeOut(CategoryOut):
+    children: List["CategoryTreeOut"] = []
@@ -1,13 +1,14 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Any
 
 
 class OrderItemIn(BaseModel):
     product_id: int
-    product_name: str
+    # название и цена берутся из каталога при оформлении, присланные значения не используются
+    product_name: Optional[str] = None
     variant_info: Optional[Any] = None
-    quantity: int
-    price: float
+    quantity: int = Field(..., gt=0)
+    price: Optional[float] = None
 
 
 class OrderBase(BaseModel):
@@ -21,6 +22,7 @@ class OrderBase(BaseModel):
 
 
 class OrderCreate(OrderBase):
+    total_amount: Optional[float] = None
     items: List[OrderItemIn]
 
 
@@ -37,6 +39,7 @@ class OrderOut(OrderBase):
     status: str
     payment_method: Optional[str] = None
     payment_status: str
+    payment_id: Optional[str] = None
     notes: Optional[str] = None
     items: List[OrderItemOut] = []
 
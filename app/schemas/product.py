@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, Any, List
+from pydantic import BaseModel, model_validator
+from typing import Optional, Any, Dict, List
 
 
 class ProductBase(BaseModel):
@@ -50,3 +50,76 @@ class ProductForm(BaseModel):
 
     class Config:
         extra = "ignore"
+
+
+class ProductImportError(BaseModel):
+    row: int
+    error: str
+
+
+class ProductImportReport(BaseModel):
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[ProductImportError] = []
+
+
+class ProductBulkFilter(BaseModel):
+    """Какие товары магазина менять: список id и/или категория."""
+    ids: Optional[List[int]] = None
+    category_id: Optional[int] = None
+
+    @model_validator(mode="after")
+    def _require_filter(self):
+        if self.ids is None and self.category_id is None:
+            raise ValueError("ids or category_id is required")
+        return self
+
+
+class ProductBulkStatus(ProductBulkFilter):
+    status: str
+
+
+class ProductBulkPrice(ProductBulkFilter):
+    percent: Optional[float] = None
+    amount: Optional[float] = None
+    price: Optional[float] = None
+
+    @model_validator(mode="after")
+    def _require_single_change(self):
+        if sum(v is not None for v in (self.percent, self.amount, self.price)) != 1:
+            raise ValueError("exactly one of percent, amount or price is required")
+        return self
+
+
+class ProductBulkStock(BaseModel):
+    stock: Dict[int, int]
+
+
+class ProductBulkResult(BaseModel):
+    affected: int
+
+
+class FacetValue(BaseModel):
+    value: Any
+    count: int
+
+
+class PriceRange(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+
+class ProductFacets(BaseModel):
+    categories: List[FacetValue] = []
+    size: List[FacetValue] = []
+    color: List[FacetValue] = []
+    price: PriceRange = PriceRange()
+    in_stock: int = 0
+
+
+class ProductFilterOut(BaseModel):
+    items: List[ProductOut]
+    total: int
+    next_cursor: Optional[str] = None
+    facets: ProductFacets
@@ -1,6 +1,10 @@
 from pydantic import BaseModel
 from datetime import datetime
 
+from app.schemas.category import CategoryTreeOut
+from app.schemas.collection import CollectionOut
+from app.schemas.product import ProductOut
+
 class StoreCreate(BaseModel):
     name: str
     description: str | None = None
@@ -32,3 +36,11 @@ class PublishedStoreOut(BaseModel):
     version: int | None = None
     published: bool = True
     published_url: str
+
+
+class StorefrontBootstrapOut(BaseModel):
+    store: PublishedStoreOut
+    categories: list[CategoryTreeOut] = []
+    collections: list[CollectionOut] = []
+    products: list[ProductOut] = []
+    products_next_cursor: str | None = None
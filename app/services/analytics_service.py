@@ -0,0 +1,102 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import Order, OrderItem, ProductSalesDailyRollup, SalesDailyRollup
+
+PAID_STATUS = "paid"
+
+
+def _sales_upsert(rows: list[dict]):
+    stmt = pg_insert(SalesDailyRollup).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[SalesDailyRollup.store_id, SalesDailyRollup.day, SalesDailyRollup.shard],
+        set_={
+            "orders_count": SalesDailyRollup.orders_count + stmt.excluded.orders_count,
+            "revenue": SalesDailyRollup.revenue + stmt.excluded.revenue,
+            "paid_orders_count": SalesDailyRollup.paid_orders_count + stmt.excluded.paid_orders_count,
+            "paid_revenue": SalesDailyRollup.paid_revenue + stmt.excluded.paid_revenue,
+        },
+    )
+
+
+async def record_order_created(db: AsyncSession, order: Order, items: list[OrderItem]) -> None:
+    """Добавляет заказ в дневные итоги; вызывается в транзакции оформления заказа."""
+    day = order.created_at.date()
+    shard = order.id % settings.ANALYTICS_ROLLUP_SHARDS
+    await db.execute(_sales_upsert([{
+        "store_id": order.store_id,
+        "day": day,
+        "shard": shard,
+        "orders_count": 1,
+        "revenue": order.total_amount,
+        "paid_orders_count": 0,
+        "paid_revenue": 0,
+    }]))
+
+    per_product: dict[int, dict] = {}
+    for item in items:
+        row = per_product.setdefault(item.product_id, {
+            "store_id": order.store_id,
+            "day": day,
+            "product_id": item.product_id,
+            "shard": shard,
+            "product_name": item.product_name,
+            "quantity": 0,
+            "revenue": Decimal(0),
+        })
+        row["quantity"] += item.quantity
+        row["revenue"] += item.price * item.quantity
+
+    # по product_id, чтобы параллельные заказы брали блокировки в одном порядке
+    rows = [per_product[pid] for pid in sorted(per_product)]
+    stmt = pg_insert(ProductSalesDailyRollup).values(rows)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[
+            ProductSalesDailyRollup.store_id,
+            ProductSalesDailyRollup.day,
+            ProductSalesDailyRollup.product_id,
+            ProductSalesDailyRollup.shard,
+        ],
+        set_={
+            "product_name": stmt.excluded.product_name,
+            "quantity": ProductSalesDailyRollup.quantity + stmt.excluded.quantity,
+            "revenue": ProductSalesDailyRollup.revenue + stmt.excluded.revenue,
+        },
+    ))
+
+
+async def record_payment_status_changes(db: AsyncSession, changes: list) -> None:
+    """Учитывает смену payment_status у пачки заказов.
+
+    changes — строки с id, store_id, created_at, total_amount, old_status, new_status.
+    Оплата относится к дню создания заказа, как и выручка по нему.
+    """
+    deltas: dict[tuple, list] = defaultdict(lambda: [0, Decimal(0)])
+    for change in changes:
+        was_paid = change.old_status == PAID_STATUS
+        is_paid = change.new_status == PAID_STATUS
+        if was_paid == is_paid:
+            continue
+        sign = 1 if is_paid else -1
+        key = (change.store_id, change.created_at.date(), change.id % settings.ANALYTICS_ROLLUP_SHARDS)
+        deltas[key][0] += sign
+        deltas[key][1] += sign * change.total_amount
+
+    if not deltas:
+        return
+    await db.execute(_sales_upsert([
+        {
+            "store_id": store_id,
+            "day": day,
+            "shard": shard,
+            "orders_count": 0,
+            "revenue": 0,
+            "paid_orders_count": count,
+            "paid_revenue": amount,
+        }
+        for (store_id, day, shard), (count, amount) in sorted(deltas.items())
+    ]))
@@ -0,0 +1,107 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.database import User
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Снимок пользователя для get_current_user: не привязан ни к какой сессии,
+    поэтому его безопасно отдавать из кэша в разные запросы."""
+    id: int
+    email: str
+    name: str | None
+    is_active: bool | None
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(id=user.id, email=user.email, name=user.name, is_active=user.is_active)
+
+
+class AuthCache:
+    """Кэш аутентификации в памяти процесса.
+
+    Два LRU: уже проверенные токены (токен -> user_id и срок действия, чтобы
+    не проверять подпись JWT на каждый запрос) и пользователи по id с TTL,
+    чтобы не ходить в users за каждым запросом. Хранятся не ORM-объекты, а
+    неизменяемые снимки CurrentUser — они не ссылаются на чужую сессию.
+    Запись пользователя сбрасывается явно (смена пароля, деактивация), TTL
+    ограничивает устаревание в воркерах, которые инвалидацию не видели.
+    """
+
+    def __init__(self, max_users: int, user_ttl: float, max_tokens: int):
+        self.max_users = max_users
+        self.user_ttl = user_ttl
+        self.max_tokens = max_tokens
+        self._users: OrderedDict[int, tuple[CurrentUser, float]] = OrderedDict()
+        self._tokens: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self.user_hits = 0
+        self.user_misses = 0
+        self.token_hits = 0
+        self.token_misses = 0
+
+    def get_token(self, token: str) -> int | None:
+        entry = self._tokens.get(token)
+        # exp в JWT — unix-время, поэтому здесь time.time(), а не monotonic
+        if entry is None or entry[1] <= time.time():
+            self._tokens.pop(token, None)
+            self.token_misses += 1
+            return None
+        self._tokens.move_to_end(token)
+        self.token_hits += 1
+        return entry[0]
+
+    def put_token(self, token: str, user_id: int, expires_at: float) -> None:
+        self._tokens[token] = (user_id, expires_at)
+        self._tokens.move_to_end(token)
+        while len(self._tokens) > self.max_tokens:
+            self._tokens.popitem(last=False)
+
+    def get_user(self, user_id: int) -> CurrentUser | None:
+        entry = self._users.get(user_id)
+        if entry is None or entry[1] < time.monotonic():
+            self._users.pop(user_id, None)
+            self.user_misses += 1
+            return None
+        self._users.move_to_end(user_id)
+        self.user_hits += 1
+        return entry[0]
+
+    def put_user(self, user: CurrentUser) -> None:
+        self._users[user.id] = (user, time.monotonic() + self.user_ttl)
+        self._users.move_to_end(user.id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        self._users.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._users.clear()
+        self._tokens.clear()
+
+    def stats(self) -> dict:
+        return {
+            "users": {
+                "size": len(self._users), "max_size": self.max_users,
+                "hits": self.user_hits, "misses": self.user_misses,
+            },
+            "tokens": {
+                "size": len(self._tokens), "max_size": self.max_tokens,
+                "hits": self.token_hits, "misses": self.token_misses,
+            },
+        }
+
+
+auth_cache = AuthCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL, settings.AUTH_TOKEN_CACHE_SIZE)
+
+
+@event.listens_for(User.is_active, "set")
+def _invalidate_on_deactivate(target: User, value, oldvalue, initiator) -> None:
+    # любое изменение is_active через ORM сбрасывает запись, где бы оно ни происходило
+    if target.id is not None and value != oldvalue:
+        auth_cache.invalidate_user(target.id)
@@ -1,3 +1,4 @@
+import time
 from datetime import timedelta
 
 from fastapi import Depends, HTTPException, status
@@ -8,6 +9,7 @@ from sqlalchemy.future import select
 
 from app.config import settings
 from app.database import User, get_db
+from app.services.auth_cache import CurrentUser, auth_cache
 from app.services.email_service import send_reset_email
 from app.services.security_service import create_token, hash_password, verify_password
 
@@ -21,7 +23,7 @@ class AuthService:
         if query.scalars().first():
             raise HTTPException(status_code=400, detail="Email already taken")
 
-        user = User(email=email, hashed_password=hash_password(password), name=name)
+        user = User(email=email, hashed_password=await hash_password(password), name=name)
         db.add(user)
         await db.commit()
         return user
@@ -31,12 +33,15 @@ class AuthService:
         query = await db.execute(select(User).where(User.email == email))
         user = query.scalars().first()
 
-        if not user or not verify_password(password, user.hashed_password):
+        if not user or not await verify_password(password, user.hashed_password):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
+        return AuthService.issue_tokens(user)
+
+    @staticmethod
+    def issue_tokens(user: User):
         access_token = create_token({"sub": str(user.id)}, timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
         refresh_token = create_token({"sub": str(user.id)}, timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
-
         return access_token, refresh_token
     
     @staticmethod
@@ -64,29 +69,43 @@ class AuthService:
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        user.hashed_password = hash_password(new_password)
+        user.hashed_password = await hash_password(new_password)
         await db.commit()
+        auth_cache.invalidate_user(user.id)
         return user
 
     @staticmethod
     async def get_current_user(
         token: str = Depends(oauth2_scheme),
         db: AsyncSession = Depends(get_db)
-    ):
-        try:
-            payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-            user_id: str = payload.get("sub")
-            if user_id is None:
-                raise HTTPException(status_code=401, detail="Invalid authentication")
-
-        except JWTError:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        query = await db.execute(select(User).where(User.id == int(user_id)))
-        user = query.scalars().first()
-
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
+    ) -> CurrentUser:
+        # в обычном случае и токен, и пользователь берутся из auth_cache без запросов к БД
+        user_id = auth_cache.get_token(token)
+        if user_id is None:
+            try:
+                payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+                sub: str = payload.get("sub")
+                if sub is None:
+                    raise HTTPException(status_code=401, detail="Invalid authentication")
+
+            except JWTError:
+                raise HTTPException(status_code=401, detail="Invalid token")
+
+            user_id = int(sub)
+            auth_cache.put_token(token, user_id, payload.get("exp", time.time() + settings.AUTH_USER_CACHE_TTL))
+
+        user = auth_cache.get_user(user_id)
+        if user is None:
+            query = await db.execute(select(User).where(User.id == user_id))
+            row = query.scalars().first()
+
+            if not row:
+                raise HTTPException(status_code=401, detail="User not found")
+            user = CurrentUser.from_user(row)
+            auth_cache.put_user(user)
+
+        if user.is_active is False:
+            raise HTTPException(status_code=401, detail="User is inactive")
 
         return user
 
@@ -103,6 +122,4 @@ class AuthService:
         if not user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
-        access_token = create_token({"sub": str(user.id)}, timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
-        new_refresh_token = create_token({"sub": str(user.id)}, timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
-        return access_token, new_refresh_token
+        return AuthService.issue_tokens(user)
@@ -0,0 +1,58 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWorker:
+    """Фоновый цикл внутри процесса приложения; запускается и гасится в lifespan.
+
+    Наследник реализует run_once(): обработать пачку и вернуть число
+    обработанных элементов. Пока работа есть, цикл крутится без пауз, иначе
+    ждёт poll_interval или сигнала notify().
+    """
+
+    name = "worker"
+
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._task: asyncio.Task | None = None
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    async def run_once(self) -> int:
+        raise NotImplementedError
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=10)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            processed = 0
+            try:
+                processed = await self.run_once()
+            except Exception:
+                logger.exception("%s iteration failed", self.name)
+            if processed or self._stopping:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
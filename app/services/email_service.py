@@ -1,6 +1,181 @@
+import asyncio
+import logging
 import smtplib
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
 from email.mime.text import MIMEText
 from app.config import settings
+from app.services.background import BackgroundWorker
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueuedMail:
+    message: MIMEText
+    attempts: int = 0
+    not_before: float = 0.0
+
+
+def _is_permanent(error: Exception) -> bool:
+    # 5xx — сервер отказал окончательно (адрес, содержимое), повтор не поможет
+    if isinstance(error, (ValueError, IndexError)):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500 \
+        and not isinstance(error, smtplib.SMTPAuthenticationError)
+
+
+class MailQueueWorker(BackgroundWorker):
+    """Очередь исходящих писем в памяти процесса.
+
+    Письма отправляются пачками через одно SMTP-соединение, которое живёт
+    между пачками и закрывается после SMTP_IDLE_TIMEOUT простоя. smtplib
+    блокирующий, поэтому отправка идёт в потоке, а event loop свободен.
+    Временные ошибки (обрыв, 4xx) повторяются с растущей задержкой.
+    Очередь не переживает перезапуск — для писем со ссылкой сброса пароля это
+    допустимо: пользователь запросит ссылку ещё раз.
+
+    Поток с отправкой нельзя прервать, поэтому отправка пачки живёт в своей
+    задаче (_in_flight) и не отменяется вместе с циклом воркера: stop()
+    дожидается её, а соединение smtplib никогда не используется двумя
+    потоками сразу (_smtp_lock).
+    """
+
+    name = "mail-queue"
+
+    def __init__(self):
+        super().__init__(settings.MAIL_POLL_INTERVAL)
+        self._queue: deque[QueuedMail] = deque()
+        self._smtp: smtplib.SMTP | None = None
+        self._smtp_lock = threading.Lock()
+        self._in_flight: asyncio.Future | None = None
+        self._last_used = 0.0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def enqueue(self, message: MIMEText) -> bool:
+        if len(self._queue) >= settings.MAIL_QUEUE_SIZE:
+            self.dropped += 1
+            logger.warning("Mail queue is full, dropping message to %s", message["To"])
+            return False
+        self._queue.append(QueuedMail(message))
+        self.notify()
+        return True
+
+    async def run_once(self) -> int:
+        now = time.monotonic()
+        batch = []
+        for _ in range(len(self._queue)):
+            if len(batch) >= settings.MAIL_BATCH_SIZE:
+                break
+            mail = self._queue.popleft()
+            if mail.not_before > now:
+                self._queue.append(mail)
+            else:
+                batch.append(mail)
+
+        if not batch:
+            if self._smtp is not None and now - self._last_used > settings.SMTP_IDLE_TIMEOUT:
+                await asyncio.to_thread(self._close)
+            return 0
+
+        self._in_flight = asyncio.ensure_future(self._deliver(batch))
+        # отмена run_once не теряет пачку: _deliver доотправит её и разберёт ошибки
+        return await asyncio.shield(self._in_flight)
+
+    async def _deliver(self, batch: list[QueuedMail]) -> int:
+        failures = await asyncio.to_thread(self._send_batch, batch)
+        for mail, error in failures:
+            mail.attempts += 1
+            if _is_permanent(error) or mail.attempts >= settings.MAIL_MAX_ATTEMPTS:
+                self.failed += 1
+                logger.error("Email to %s failed after %s attempts: %s", mail.message["To"], mail.attempts, error)
+                continue
+            mail.not_before = time.monotonic() + settings.MAIL_RETRY_BASE_DELAY * 2 ** (mail.attempts - 1)
+            self._queue.append(mail)
+        self.sent += len(batch) - len(failures)
+        return len(batch) - len(failures)
+
+    async def stop(self) -> None:
+        await super().stop()
+        # цикл мог быть отменён посреди пачки — дожидаемся её, прежде чем отправлять остальное
+        if self._in_flight is not None and not self._in_flight.done():
+            await asyncio.wait([self._in_flight])
+        # то, что уже готово к отправке, пробуем отправить перед выходом
+        if self._queue:
+            await self.run_once()
+        if self._queue:
+            logger.warning("Mail queue stopped with %s unsent messages", len(self._queue))
+        await asyncio.to_thread(self._close)
+
+    def _connect(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            smtp_class = smtplib.SMTP_SSL if settings.SMTP_USE_SSL else smtplib.SMTP
+            smtp = smtp_class(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT)
+            try:
+                if settings.SMTP_USER:
+                    smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+            except Exception:
+                smtp.close()
+                raise
+            self._smtp = smtp
+        return self._smtp
+
+    def _close(self) -> None:
+        with self._smtp_lock:
+            self._close_locked()
+
+    def _close_locked(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+
+    def _send_batch(self, batch: list[QueuedMail]) -> list[tuple[QueuedMail, Exception]]:
+        """Выполняется в потоке. Возвращает неотправленные письма с ошибками."""
+        with self._smtp_lock:
+            return self._send_batch_locked(batch)
+
+    def _send_batch_locked(self, batch: list[QueuedMail]) -> list[tuple[QueuedMail, Exception]]:
+        failures = []
+        for index, mail in enumerate(batch):
+            try:
+                self._send(mail.message)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError,
+                    smtplib.SMTPNotSupportedError, ValueError, IndexError) as e:
+                # сервер отказал в конкретном письме или письмо битое, соединение живо;
+                # ловим до OSError: SMTPException — его подкласс
+                failures.append((mail, e))
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError,
+                    smtplib.SMTPAuthenticationError, OSError) as e:
+                # соединение не поднимается — остальные письма пачки отложим с той же ошибкой
+                self._close_locked()
+                failures.extend((rest, e) for rest in batch[index:])
+                break
+        self._last_used = time.monotonic()
+        return failures
+
+    def _send(self, message: MIMEText) -> None:
+        try:
+            self._connect().send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # сервер мог закрыть простаивавшее соединение — переподключаемся один раз
+            self._close_locked()
+            self._connect().send_message(message)
+
+    def stats(self) -> dict:
+        return {"queued": len(self._queue), "sent": self.sent, "failed": self.failed, "dropped": self.dropped}
+
+
+mail_queue = MailQueueWorker()
 
 
 async def send_reset_email(email: str, token: str):
@@ -8,13 +183,8 @@ async def send_reset_email(email: str, token: str):
 
     msg = MIMEText(f"Для восстановления пароля перейдите по ссылке:\n{reset_link}")
     msg["Subject"] = "Восстановление пароля"
-    msg["From"] = settings.SMTP_USER
+    msg["From"] = settings.MAIL_FROM or settings.SMTP_USER
     msg["To"] = email
 
-    try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-            server.send_message(msg)
-        print(f"Email sent to {email}")
-    except Exception as e:
-        print(f"Email send error: {e}")
+    # письмо уходит фоновым воркером, запрос его не ждёт
+    mail_queue.enqueue(msg)
@@ -0,0 +1,111 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import AsyncIterator
+
+from sqlalchemy import and_, select
+
+from app.config import settings
+from app.database import Order, OrderItem, Product, SessionLocal
+
+PRODUCT_EXPORT_COLUMNS = [c for c in Product.__table__.c if c.key != "search_vector"]
+ORDER_EXPORT_COLUMNS = list(Order.__table__.c)
+ORDER_ITEM_EXPORT_COLUMNS = [c for c in OrderItem.__table__.c if c.key not in ("order_id", "order_created_at")]
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=_json_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def _csv_value(value):
+    if isinstance(value, (dict, list)):
+        return _dumps(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunk(rows: list[list]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([[_csv_value(v) for v in row] for row in rows])
+    return buffer.getvalue().encode("utf-8")
+
+
+async def _stream_partitions(stmt) -> AsyncIterator[list]:
+    """Читает результат серверным курсором пачками по EXPORT_BATCH_SIZE строк.
+
+    Сессия открывается здесь, а не через get_db: зависимость закрывается раньше,
+    чем StreamingResponse дочитает генератор.
+    """
+    async with SessionLocal() as session:
+        result = await session.stream(stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            yield partition
+
+
+async def stream_products(store_id: int, fmt: str) -> AsyncIterator[bytes]:
+    keys = [c.key for c in PRODUCT_EXPORT_COLUMNS]
+    stmt = select(*PRODUCT_EXPORT_COLUMNS).where(Product.store_id == store_id).order_by(Product.id)
+
+    if fmt == "csv":
+        yield _csv_chunk([keys])
+    async for partition in _stream_partitions(stmt):
+        if fmt == "csv":
+            yield _csv_chunk([list(row) for row in partition])
+        else:
+            yield "".join(_dumps(dict(zip(keys, row))) + "\n" for row in partition).encode("utf-8")
+
+
+async def stream_orders(store_id: int, fmt: str) -> AsyncIterator[bytes]:
+    """Заказы вместе с позициями одним упорядоченным JOIN-ом, без ленивых догрузок.
+
+    CSV — строка на позицию (поля заказа повторяются), NDJSON — строка на заказ
+    с массивом items.
+    """
+    order_keys = [c.key for c in ORDER_EXPORT_COLUMNS]
+    item_keys = [c.key for c in ORDER_ITEM_EXPORT_COLUMNS]
+    item_labels = [c.label(f"item_{c.key}") for c in ORDER_ITEM_EXPORT_COLUMNS]
+    stmt = (
+        select(*ORDER_EXPORT_COLUMNS, *item_labels)
+        .outerjoin(OrderItem, and_(
+            OrderItem.order_id == Order.id,
+            OrderItem.order_created_at == Order.created_at,
+        ))
+        .where(Order.store_id == store_id)
+        .order_by(Order.id, OrderItem.id)
+    )
+    width = len(order_keys)
+    id_index = order_keys.index("id")
+
+    if fmt == "csv":
+        yield _csv_chunk([order_keys + [f"item_{key}" for key in item_keys]])
+        async for partition in _stream_partitions(stmt):
+            yield _csv_chunk([list(row) for row in partition])
+        return
+
+    current = None
+    async for partition in _stream_partitions(stmt):
+        lines = []
+        for row in partition:
+            if current is None or current["id"] != row[id_index]:
+                if current is not None:
+                    lines.append(_dumps(current) + "\n")
+                current = dict(zip(order_keys, row[:width]))
+                current["items"] = []
+            if row[width] is not None:
+                current["items"].append(dict(zip(item_keys, row[width:])))
+        if lines:
+            yield "".join(lines).encode("utf-8")
+    if current is not None:
+        yield (_dumps(current) + "\n").encode("utf-8")
@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from app.config import settings
+from app.database import IdempotencyKey, SessionLocal
+from app.services.background import BackgroundWorker
+
+logger = logging.getLogger(__name__)
+
+CLEANUP_BATCH_SIZE = 1000
+
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    body: Any
+
+
+def request_fingerprint(payload: BaseModel) -> str:
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+
+class _KeyLocks:
+    """asyncio.Lock на ключ: дубликаты внутри одного процесса ждут первый запрос,
+    а не получают 409. Замок удаляется, когда его больше никто не ждёт."""
+
+    def __init__(self):
+        self._locks: dict[str, list] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: str):
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+
+_key_locks = _KeyLocks()
+
+
+def idempotency_lock(key: str):
+    return _key_locks.hold(key)
+
+
+async def claim_idempotency_key(key: str, request_hash: str) -> StoredResponse | None:
+    """Занимает ключ или возвращает сохранённый ответ.
+
+    None — ключ наш, запрос нужно выполнить. Просроченный ключ или ключ,
+    «зависший» дольше IDEMPOTENCY_LOCK_TIMEOUT, занимается заново. Захват
+    коммитится в отдельной сессии сразу, чтобы его видели другие реплики.
+    """
+    stmt = insert(IdempotencyKey).values(
+        key=key,
+        request_hash=request_hash,
+        locked_until=func.now() + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT),
+        expires_at=func.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.key],
+        set_={
+            "request_hash": stmt.excluded.request_hash,
+            "status_code": None,
+            "response_body": None,
+            "locked_until": stmt.excluded.locked_until,
+            "expires_at": stmt.excluded.expires_at,
+        },
+        where=or_(
+            IdempotencyKey.expires_at < func.now(),
+            and_(IdempotencyKey.status_code.is_(None), IdempotencyKey.locked_until < func.now()),
+        ),
+    ).returning(IdempotencyKey.key)
+
+    async with SessionLocal() as session:
+        claimed = (await session.execute(stmt)).scalar_one_or_none()
+        row = None
+        if claimed is None:
+            row = (await session.execute(
+                select(IdempotencyKey.request_hash, IdempotencyKey.status_code, IdempotencyKey.response_body)
+                .where(IdempotencyKey.key == key)
+            )).first()
+        await session.commit()
+
+    if claimed is not None:
+        return None
+    if row is not None and row.request_hash != request_hash:
+        raise HTTPException(422, "Idempotency-Key was already used with a different request")
+    if row is None or row.status_code is None:
+        raise HTTPException(
+            409, "Request with this Idempotency-Key is still in progress", headers={"Retry-After": "1"}
+        )
+    return StoredResponse(row.status_code, row.response_body)
+
+
+async def store_idempotent_response(db: AsyncSession, key: str, status_code: int, body: Any) -> None:
+    """Сохраняет ответ в транзакции вызывающего — вместе с самими изменениями."""
+    await db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key)
+        .values(status_code=status_code, response_body=body)
+    )
+
+
+async def release_idempotency_key(key: str) -> None:
+    """Отпускает ключ после ошибки, чтобы клиент мог повторить запрос."""
+    async with SessionLocal() as session:
+        await session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+        )
+        await session.commit()
+
+
+class IdempotencyKeyJanitor(BackgroundWorker):
+    """Удаляет просроченные ключи пачками, чтобы таблица не росла бесконечно."""
+
+    name = "idempotency-janitor"
+
+    def __init__(self):
+        super().__init__(settings.IDEMPOTENCY_CLEANUP_INTERVAL)
+
+    async def run_once(self) -> int:
+        expired = (
+            select(IdempotencyKey.key)
+            .where(IdempotencyKey.expires_at < func.now())
+            .limit(CLEANUP_BATCH_SIZE)
+        )
+        async with SessionLocal() as session:
+            result = await session.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(expired)))
+            await session.commit()
+        if result.rowcount:
+            logger.info("Removed %s expired idempotency keys", result.rowcount)
+        return result.rowcount
+
+
+idempotency_key_janitor = IdempotencyKeyJanitor()
@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import MediaAlias, MediaFile, SessionLocal
+
+# запас на заголовки multipart поверх самого файла
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+@dataclass
+class StoredUpload:
+    path: Path
+    sha256: str
+    size: int
+
+
+def spool_upload(source: BinaryIO, directory: Path) -> StoredUpload:
+    """Копирует загрузку кусками во временный файл в directory, считая sha256 по ходу.
+
+    Блокирующая функция — вызывать через asyncio.to_thread. Память на загрузку
+    ограничена одним куском, файл читается ровно один раз. При превышении
+    MEDIA_MAX_UPLOAD_BYTES копирование прерывается и временный файл удаляется.
+    Возвращает путь временного файла: его нужно перенести place_upload или удалить.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".tmp")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := source.read(settings.MEDIA_UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.MEDIA_MAX_UPLOAD_BYTES:
+                    raise UploadTooLarge(f"Upload exceeds {settings.MEDIA_MAX_UPLOAD_BYTES} bytes")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return StoredUpload(Path(tmp_name), digest.hexdigest(), size)
+
+
+def place_upload(tmp_path: Path, dest_path: Path) -> None:
+    """Сбрасывает временный файл на диск и атомарно переименовывает в dest_path.
+
+    tmp_path должен лежать на той же файловой системе, что и dest_path.
+    """
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(tmp_path, "rb") as written:
+        os.fsync(written.fileno())
+    os.replace(tmp_path, dest_path)
+
+
+# временные файлы загрузок: внутри MEDIA_ROOT, чтобы перенос был rename, а не копированием
+INCOMING_DIR = ".incoming"
+SUFFIX = re.compile(r"^\.[a-z0-9]{1,10}$")
+# ab/cd/<sha256>.<ext> — два уровня по 256 каталогов, в каждом листе единицы файлов даже на миллионах
+SHARDED_NAME = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]{1,10}$")
+
+
+@dataclass
+class StoredMedia:
+    path: str
+    sha256: str
+    size: int
+    deduplicated: bool
+
+
+def normalize_suffix(filename: str | None) -> str:
+    suffix = Path(filename or "").suffix.lower()
+    return suffix if SUFFIX.match(suffix) else ".jpg"
+
+
+def sharded_path(sha256: str, suffix: str) -> str:
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}{suffix}"
+
+
+def _add_reference(sha256: str, path: str, size: int, content_type: str | None):
+    return (
+        insert(MediaFile)
+        .values(sha256=sha256, path=path, size=size, content_type=content_type, ref_count=1)
+        .on_conflict_do_update(index_elements=[MediaFile.sha256], set_={"ref_count": MediaFile.ref_count + 1})
+        .returning(MediaFile.path)
+    )
+
+
+async def store_media(db: AsyncSession, source: BinaryIO, suffix: str, content_type: str | None) -> StoredMedia:
+    """Сохраняет загрузку по адресу её содержимого.
+
+    Файл за один проход копируется во временный в MEDIA_ROOT/.incoming и
+    хэшируется. Если такие байты уже лежат в хранилище, временный файл просто
+    удаляется (без fsync), увеличивается ref_count и возвращается
+    существующий путь (с расширением первой загрузки); иначе временный файл
+    переименовывается в ab/cd/<sha256><расширение>.
+    """
+    root = Path(settings.MEDIA_ROOT)
+    spooled = await asyncio.to_thread(spool_upload, source, root / INCOMING_DIR)
+    try:
+        existing = await db.scalar(select(MediaFile.path).where(MediaFile.sha256 == spooled.sha256))
+        path = existing or sharded_path(spooled.sha256, suffix)
+        deduplicated = existing is not None and await asyncio.to_thread((root / path).is_file)
+        if not deduplicated:
+            # файла нет совсем или он пропал с диска — кладём по тому же адресу
+            await asyncio.to_thread(place_upload, spooled.path, root / path)
+    finally:
+        spooled.path.unlink(missing_ok=True)
+
+    path = (await db.execute(_add_reference(spooled.sha256, path, spooled.size, content_type))).scalar_one()
+    await db.commit()
+    return StoredMedia(path, spooled.sha256, spooled.size, deduplicated)
+
+
+async def resolve_legacy_name(name: str) -> str | None:
+    """Путь в новом хранилище для старого плоского имени, если файл перенесён."""
+    async with SessionLocal() as db:
+        return await db.scalar(
+            select(MediaFile.path).join(MediaAlias, MediaAlias.sha256 == MediaFile.sha256).where(MediaAlias.name == name)
+        )
+
+
+class UploadSizeLimitMiddleware:
+    """ASGI-middleware: обрывает загрузку на path_prefix, как только тело
+    запроса превысило лимит, — ещё до того, как Starlette разберёт multipart
+    и сложит файл во временное хранилище."""
+
+    def __init__(self, app, path_prefix: str, max_bytes: int):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # отвечаем 413 сами, а приложению сообщаем, что клиент отключился
+                    rejected = True
+                    await self._reject(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            if not rejected:
+                await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+    @staticmethod
+    async def _reject(send) -> None:
+        body = b'{"detail":"File is too large"}'
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,41 @@
+import logging
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.background import BackgroundWorker
+
+logger = logging.getLogger(__name__)
+
+# секционированная таблица -> колонка ключа секционирования
+PARTITIONED_TABLES = {
+    "orders": "created_at",
+    "order_items": "order_created_at",
+}
+
+
+class OrderPartitionMaintainer(BackgroundWorker):
+    """Заранее создаёт месячные секции orders/order_items.
+
+    Если секция всё же не успела появиться, строки попадают в DEFAULT и
+    переносятся в новую секцию при её создании (см. create_monthly_partition).
+    """
+
+    name = "order-partitions"
+
+    def __init__(self):
+        super().__init__(settings.ORDER_PARTITION_CHECK_INTERVAL)
+
+    async def run_once(self) -> int:
+        async with SessionLocal() as session:
+            for table, key_column in PARTITIONED_TABLES.items():
+                await session.execute(
+                    text("SELECT ensure_monthly_partitions(:table, :key_column, :months_ahead)"),
+                    {"table": table, "key_column": key_column, "months_ahead": settings.ORDER_PARTITIONS_AHEAD},
+                )
+            await session.commit()
+        return 0
+
+
+order_partition_maintainer = OrderPartitionMaintainer()
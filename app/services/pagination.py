@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import Column, bindparam, tuple_
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: list[Column]) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [_coerce(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+
+
+def _coerce(column: Column, value):
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    return python_type(value)
+
+
+def keyset_paginate(query, columns: list[Column], cursor: str | None, limit: int, descending: bool = False):
+    """Добавляет к запросу keyset-условие, сортировку и limit.
+
+    Последняя колонка должна быть уникальной (обычно id), иначе страницы
+    могут терять или дублировать строки. Выбирается limit + 1 строка, чтобы
+    page_with_cursor понял, есть ли следующая страница.
+    """
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        key = tuple_(*columns)
+        bound = tuple_(*[bindparam(None, v, type_=c.type) for c, v in zip(columns, values)])
+        query = query.where(key < bound if descending else key > bound)
+
+    order = [c.desc() for c in columns] if descending else list(columns)
+    return query.order_by(*order).limit(limit + 1)
+
+
+def page_with_cursor(rows: list, columns: list[Column], limit: int) -> tuple[list, str | None]:
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, c.key) for c in columns])
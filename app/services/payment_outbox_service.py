@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import random
+from datetime import timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.sql import func
+
+from app.config import settings
+from app.database import Order, PaymentOutbox, SessionLocal
+from app.services.background import BackgroundWorker
+from app.services.yookassa_payment_service import create_payment
+
+logger = logging.getLogger(__name__)
+
+
+def build_payment_data(order_id: int, total_price) -> dict:
+    return {
+        "amount": {
+            "value": f"{round(total_price, 2)}",
+            "currency": "RUB" # TODO хорошо бы учитывать, в какой валюте будет платить клиент, но на данном этапе не важно
+        },
+        "capture": True,
+        "confirmation": {
+            "type": "redirect",
+            "return_url": settings.PAYMENT_RETURN_URL # TODO url редиректа после оплаты
+        },
+        "description": f"Заказ №{order_id}", # TODO нормальное описание заказа
+        "metadata": {
+            "order_id": order_id
+        }
+    }
+
+
+def retry_delay(attempts: int) -> float:
+    delay = min(settings.PAYMENT_RETRY_MAX_DELAY, settings.PAYMENT_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class PaymentOutboxWorker(BackgroundWorker):
+    """Создаёт платежи по записям payment_outbox.
+
+    Записи забираются через FOR UPDATE SKIP LOCKED и сразу получают «аренду»
+    (next_attempt_at в будущем), поэтому несколько реплик не возьмут одну запись,
+    а упавший посреди обработки процесс просто отдаст её на повтор.
+    Idempotence-Key привязан к заказу, так что повтор не создаст второй платёж.
+    """
+
+    name = "payment-outbox"
+
+    def __init__(self):
+        super().__init__(settings.PAYMENT_WORKER_POLL_INTERVAL)
+        self._semaphore = asyncio.Semaphore(settings.PAYMENT_WORKER_CONCURRENCY)
+
+    async def run_once(self) -> int:
+        due = (
+            select(PaymentOutbox.id)
+            .where(PaymentOutbox.status == "pending", PaymentOutbox.next_attempt_at <= func.now())
+            .order_by(PaymentOutbox.next_attempt_at)
+            .limit(settings.PAYMENT_WORKER_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        claim = (
+            update(PaymentOutbox)
+            .where(PaymentOutbox.id.in_(due))
+            .values(
+                attempts=PaymentOutbox.attempts + 1,
+                next_attempt_at=func.now() + timedelta(seconds=settings.PAYMENT_WORKER_LEASE),
+            )
+            .returning(PaymentOutbox.id, PaymentOutbox.order_id, PaymentOutbox.amount, PaymentOutbox.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        async with SessionLocal() as db:
+            claimed = (await db.execute(claim)).all()
+            await db.commit()
+
+        await asyncio.gather(*(self._process(entry) for entry in claimed))
+        return len(claimed)
+
+    async def _process(self, entry) -> None:
+        async with self._semaphore:
+            try:
+                payment_id = await create_payment(
+                    settings.YOOKASSA_SHOP_ID,
+                    settings.YOOKASSA_SECRET_KEY,
+                    build_payment_data(entry.order_id, entry.amount),
+                    idempotence_key=f"order-{entry.order_id}",
+                )
+            except Exception as e:
+                logger.warning("Payment for order %s failed (attempt %s): %s", entry.order_id, entry.attempts, e)
+                await self._reschedule(entry, str(e))
+                return
+
+        async with SessionLocal() as db:
+            await db.execute(
+                update(Order).where(Order.id == entry.order_id).values(payment_id=payment_id)
+                .execution_options(synchronize_session=False)
+            )
+            await db.execute(
+                update(PaymentOutbox).where(PaymentOutbox.id == entry.id).values(status="done", last_error=None)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+    async def _reschedule(self, entry, error: str) -> None:
+        if entry.attempts >= settings.PAYMENT_MAX_ATTEMPTS:
+            values = {"status": "failed", "last_error": error}
+        else:
+            values = {
+                "last_error": error,
+                "next_attempt_at": func.now() + timedelta(seconds=retry_delay(entry.attempts)),
+            }
+        async with SessionLocal() as db:
+            await db.execute(
+                update(PaymentOutbox).where(PaymentOutbox.id == entry.id).values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+
+payment_outbox_worker = PaymentOutboxWorker()
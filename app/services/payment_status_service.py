@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import DateTime, Integer, String, any_, bindparam, column, func, select, update, values
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import Order
+from app.services.analytics_service import PAID_STATUS, record_payment_status_changes
+
+# статус платежа ЮKassa -> (payment_status, status) заказа; остальные статусы заказ не меняют
+PAYMENT_STATUS_MAP = {
+    "succeeded": (PAID_STATUS, "paid"),
+    "canceled": ("canceled", "canceled"),
+}
+
+
+@dataclass
+class PaymentStatusUpdate:
+    order_id: int
+    payment_id: str
+    payment_status: str
+    status: str
+
+
+@dataclass
+class PaymentStatusChange:
+    id: int
+    store_id: int
+    created_at: datetime
+    total_amount: Decimal
+    old_status: str | None
+    new_status: str
+
+
+def update_from_payment(payment: dict) -> PaymentStatusUpdate | None:
+    """Переводит объект платежа ЮKassa в изменение заказа; None — менять нечего.
+
+    ValueError, если в metadata нет корректного order_id.
+    """
+    mapped = PAYMENT_STATUS_MAP.get(payment.get("status"))
+    if mapped is None:
+        return None
+    order_id = (payment.get("metadata") or {}).get("order_id")
+    if order_id is None:
+        raise ValueError(f"payment {payment.get('id')} has no order_id in metadata")
+    return PaymentStatusUpdate(int(order_id), payment["id"], *mapped)
+
+
+async def apply_payment_updates(db: AsyncSession, updates: list[PaymentStatusUpdate]) -> list[PaymentStatusChange]:
+    """Применяет пачку изменений одним SELECT ... FOR UPDATE и одним UPDATE FROM VALUES.
+
+    Уведомления по платежу, который уже не привязан к заказу, и изменения,
+    не меняющие payment_status, пропускаются. Итоги продаж обновляются
+    в той же транзакции. Коммит — на вызывающем.
+    """
+    latest = {u.order_id: u for u in updates}
+    if not latest:
+        return []
+
+    current = (await db.execute(
+        select(Order.id, Order.store_id, Order.created_at, Order.total_amount, Order.payment_status, Order.payment_id)
+        .where(Order.id == any_(bindparam("order_ids", sorted(latest), type_=ARRAY(Integer))))
+        .order_by(Order.id)
+        .with_for_update()
+    )).all()
+
+    changes = []
+    for row in current:
+        target = latest[row.id]
+        if row.payment_id and row.payment_id != target.payment_id:
+            continue
+        if row.payment_status == target.payment_status:
+            continue
+        changes.append((row, target))
+    if not changes:
+        return []
+
+    new_values = values(
+        column("id", Integer),
+        column("created_at", DateTime),
+        column("payment_id", String),
+        column("payment_status", String),
+        column("status", String),
+        name="new_values",
+    ).data([
+        (row.id, row.created_at, target.payment_id, target.payment_status, target.status)
+        for row, target in changes
+    ])
+    await db.execute(
+        update(Order.__table__)
+        .where(Order.id == new_values.c.id, Order.created_at == new_values.c.created_at)
+        .values(
+            payment_status=new_values.c.payment_status,
+            status=new_values.c.status,
+            payment_id=func.coalesce(Order.payment_id, new_values.c.payment_id),
+        )
+    )
+
+    result = [
+        PaymentStatusChange(row.id, row.store_id, row.created_at, row.total_amount, row.payment_status, target.payment_status)
+        for row, target in changes
+    ]
+    await record_payment_status_changes(db, result)
+    return result
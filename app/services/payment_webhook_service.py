@@ -0,0 +1,104 @@
+import logging
+from datetime import timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.sql import func
+
+from app.config import settings
+from app.database import PaymentWebhookEvent, SessionLocal
+from app.services.background import BackgroundWorker
+from app.services.payment_outbox_service import retry_delay
+from app.services.payment_status_service import apply_payment_updates, update_from_payment
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentWebhookWorker(BackgroundWorker):
+    """Обрабатывает сохранённые уведомления ЮKassa пачками.
+
+    Забор пачки устроен как в PaymentOutboxWorker: FOR UPDATE SKIP LOCKED и
+    «аренда» через next_attempt_at. Вся пачка применяется к заказам одной
+    транзакцией; если она упала, события уходят на повтор с задержкой.
+    """
+
+    name = "payment-webhooks"
+
+    def __init__(self):
+        super().__init__(settings.WEBHOOK_WORKER_POLL_INTERVAL)
+
+    async def run_once(self) -> int:
+        due = (
+            select(PaymentWebhookEvent.id)
+            .where(PaymentWebhookEvent.status == "pending", PaymentWebhookEvent.next_attempt_at <= func.now())
+            .order_by(PaymentWebhookEvent.id)
+            .limit(settings.WEBHOOK_WORKER_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        claim = (
+            update(PaymentWebhookEvent)
+            .where(PaymentWebhookEvent.id.in_(due))
+            .values(
+                attempts=PaymentWebhookEvent.attempts + 1,
+                next_attempt_at=func.now() + timedelta(seconds=settings.PAYMENT_WORKER_LEASE),
+            )
+            .returning(PaymentWebhookEvent.id, PaymentWebhookEvent.payload, PaymentWebhookEvent.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        async with SessionLocal() as db:
+            claimed = sorted((await db.execute(claim)).all(), key=lambda e: e.id)
+            await db.commit()
+        if not claimed:
+            return 0
+
+        updates, invalid = [], {}
+        for event in claimed:
+            try:
+                status_update = update_from_payment(event.payload.get("object") or {})
+            except (ValueError, KeyError, TypeError) as e:
+                invalid[event.id] = str(e)
+                continue
+            if status_update is not None:
+                updates.append(status_update)
+
+        try:
+            async with SessionLocal() as db:
+                await apply_payment_updates(db, updates)
+                await self._finish(db, [e.id for e in claimed], invalid)
+                await db.commit()
+        except Exception as e:
+            logger.warning("Payment webhook batch of %s events failed: %s", len(claimed), e)
+            await self._reschedule(claimed, str(e))
+        return len(claimed)
+
+    async def _finish(self, db, event_ids: list[int], invalid: dict[int, str]) -> None:
+        await db.execute(
+            update(PaymentWebhookEvent)
+            .where(PaymentWebhookEvent.id.in_(event_ids))
+            .values(status="done", last_error=None, processed_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        # битые уведомления повторять бессмысленно, оставляем их для разбора
+        for event_id, error in invalid.items():
+            await db.execute(
+                update(PaymentWebhookEvent).where(PaymentWebhookEvent.id == event_id).values(status="failed", last_error=error)
+                .execution_options(synchronize_session=False)
+            )
+
+    async def _reschedule(self, claimed: list, error: str) -> None:
+        async with SessionLocal() as db:
+            for event in claimed:
+                if event.attempts >= settings.PAYMENT_MAX_ATTEMPTS:
+                    values = {"status": "failed", "last_error": error}
+                else:
+                    values = {
+                        "last_error": error,
+                        "next_attempt_at": func.now() + timedelta(seconds=retry_delay(event.attempts)),
+                    }
+                await db.execute(
+                    update(PaymentWebhookEvent).where(PaymentWebhookEvent.id == event.id).values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+
+
+payment_webhook_worker = PaymentWebhookWorker()
@@ -0,0 +1,146 @@
+import math
+import time
+from datetime import timedelta
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, text
+from sqlalchemy.sql import func
+
+from app.config import settings
+from app.database import RateLimitBucket, SessionLocal
+
+# как часто вычищать ключи, чьи корзины уже снова полные
+SWEEP_INTERVAL = 60.0
+
+
+class TokenBucketLimiter:
+    """Token bucket в памяти процесса.
+
+    Корзина — кортеж (токены, время обновления) в обычном dict: проверка —
+    один pop/вставка и немного арифметики. Переставляя ключ в конец при
+    каждом обращении, dict держит порядок LRU, поэтому при переполнении
+    max_keys за O(1) выбрасывается самый давний ключ. Раз в SWEEP_INTERVAL
+    удаляются корзины, успевшие наполниться: отсутствующий ключ и полная
+    корзина эквивалентны.
+    """
+
+    def __init__(self, per_minute: float, burst: int, max_keys: int):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._next_sweep = time.monotonic() + SWEEP_INTERVAL
+        self.allowed = 0
+        self.denied = 0
+
+    def acquire(self, key: str) -> float:
+        """0 — попытка разрешена, иначе через сколько секунд можно повторить."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+            self.allowed += 1
+        else:
+            wait = (1 - tokens) / self.rate
+            self.denied += 1
+        self._buckets[key] = (tokens, now)
+
+        if len(self._buckets) > self.max_keys:
+            del self._buckets[next(iter(self._buckets))]
+        if now >= self._next_sweep:
+            self._sweep(now)
+        return wait
+
+    def _sweep(self, now: float) -> None:
+        self._next_sweep = now + SWEEP_INTERVAL
+        refill_time = self.burst / self.rate
+        for key in [k for k, (_, updated) in self._buckets.items() if now - updated >= refill_time]:
+            del self._buckets[key]
+
+    def stats(self) -> dict:
+        return {"size": len(self._buckets), "max_size": self.max_keys, "allowed": self.allowed, "denied": self.denied}
+
+
+class PostgresBuckets:
+    """Те же корзины в таблице rate_limit_buckets — лимиты общие для всех реплик.
+
+    Пополнение и списание — один атомарный UPSERT. Отказ оставляет в корзине
+    не больше -1 токена, поэтому долбящий клиент ждёт чуть дольше, но не
+    копит штраф бесконечно.
+    """
+
+    ACQUIRE = text("""
+        INSERT INTO rate_limit_buckets AS b (key, tokens, updated_at)
+        VALUES (:key, CAST(:burst AS double precision) - 1, clock_timestamp())
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = GREATEST(
+                LEAST(
+                    CAST(:burst AS double precision),
+                    b.tokens + EXTRACT(EPOCH FROM clock_timestamp()::timestamp - b.updated_at)
+                        * CAST(:rate AS double precision)
+                ) - 1,
+                -1
+            ),
+            updated_at = clock_timestamp()
+        RETURNING tokens
+    """)
+
+    def __init__(self):
+        self._next_sweep = time.monotonic() + SWEEP_INTERVAL
+
+    async def acquire(self, key: str, rate: float, burst: int, refill_time: float) -> float:
+        async with SessionLocal() as db:
+            tokens = (await db.execute(self.ACQUIRE, {"key": key, "burst": burst, "rate": rate})).scalar_one()
+            if time.monotonic() >= self._next_sweep:
+                self._next_sweep = time.monotonic() + SWEEP_INTERVAL
+                await db.execute(delete(RateLimitBucket).where(
+                    RateLimitBucket.updated_at < func.now() - timedelta(seconds=refill_time)
+                ))
+            await db.commit()
+        return 0.0 if tokens >= 0 else (1 - tokens) / rate
+
+
+class AuthRateLimiter:
+    """Лимиты попыток на auth-эндпоинтах по IP и по паре (IP, email).
+
+    IP клиента берётся из request.client.host, поэтому uvicorn за прокси
+    должен запускаться с --proxy-headers и --forwarded-allow-ips. Email
+    учитывается только вместе с IP: иначе любой, зная чужой адрес, мог бы
+    исчерпать его корзину и не дать владельцу войти.
+
+    Проверка в памяти идёт первой и отсекает перебор без обращения к БД и
+    до bcrypt; общий backend, если включён, проверяется только для уже
+    пропущенных локально попыток.
+    """
+
+    def __init__(self):
+        self.ip = TokenBucketLimiter(settings.RATE_LIMIT_IP_PER_MINUTE, settings.RATE_LIMIT_IP_BURST, settings.RATE_LIMIT_MAX_KEYS)
+        self.email = TokenBucketLimiter(
+            settings.RATE_LIMIT_EMAIL_PER_MINUTE, settings.RATE_LIMIT_EMAIL_BURST, settings.RATE_LIMIT_MAX_KEYS
+        )
+        self.shared = PostgresBuckets() if settings.RATE_LIMIT_BACKEND == "postgres" else None
+        self._refill_time = max(l.burst / l.rate for l in (self.ip, self.email))
+
+    async def check(self, ip: str | None, email: str | None = None) -> None:
+        checks = [(self.ip, f"ip:{ip}")]
+        if email:
+            checks.append((self.email, f"email:{ip}:{email.lower()}"))
+
+        for limiter, key in checks:
+            wait = limiter.acquire(key)
+            if not wait and self.shared is not None:
+                wait = await self.shared.acquire(key, limiter.rate, limiter.burst, self._refill_time)
+            if wait:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many attempts, try again later",
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+
+    def stats(self) -> dict:
+        return {"backend": settings.RATE_LIMIT_BACKEND, "ip": self.ip.stats(), "email": self.email.stats()}
+
+
+auth_rate_limiter = AuthRateLimiter()
@@ -1,21 +1,47 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 from jose import jwt
 from app.config import settings
 
-from passlib.context import CryptContext
-
 pwd_context = CryptContext(
     schemes=["bcrypt_sha256"],
     deprecated="auto",
 )
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+# bcrypt отпускает GIL, поэтому потоки считают хэши параллельно и не держат event loop
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_in_flight = 0
+
+
+async def _run_hashing(func, *args):
+    """Выполняет bcrypt в пуле потоков; при переполненной очереди — 503 вместо ожидания."""
+    global _hash_in_flight
+    if _hash_in_flight >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, try again later",
+            headers={"Retry-After": "1"},
+        )
+    _hash_in_flight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_in_flight -= 1
+
+
+def hash_queue_depth() -> int:
+    return _hash_in_flight
+
+
+async def hash_password(password: str) -> str:
+    return await _run_hashing(pwd_context.hash, password)
 
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+async def verify_password(plain: str, hashed: str) -> bool:
+    return await _run_hashing(pwd_context.verify, plain, hashed)
 
 
 def create_token(data: dict, expires_delta: timedelta):
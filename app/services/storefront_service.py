@@ -0,0 +1,171 @@
+import gzip
+import hashlib
+import os
+import shutil
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import brotli
+
+from app.config import settings
+from app.database import Store, StoreDesign
+from app.schemas.store import PublishedStoreOut
+
+
+def build_published_store(store: Store, design: StoreDesign) -> PublishedStoreOut:
+    return PublishedStoreOut(
+        id=store.id,
+        name=store.name,
+        slug=store.slug,
+        description=store.description,
+        color=store.color,
+        logo_url=store.logo_url,
+        domain=store.domain,
+        design_data=design.design_data,
+        theme=design.theme,
+        custom_css=design.custom_css,
+        version=design.version,
+        published=True,
+        published_url=f"{settings.PUBLIC_BASE_URL.rstrip('/')}/s/{store.slug}",
+    )
+
+
+# Варианты статического артефакта: Content-Encoding -> суффикс файла
+ARTIFACT_ENCODINGS = {"br": ".br", "gzip": ".gz", "identity": ""}
+# имя артефакта: <версия дизайна>-<хэш содержимого>
+ARTIFACT_NAME_PATTERN = r"^[0-9]+-[0-9a-f]{16}$"
+
+
+def _storefronts_root() -> Path:
+    return Path(settings.MEDIA_ROOT) / "storefronts"
+
+
+def storefront_artifact_dir(store_id: int) -> Path:
+    return _storefronts_root() / str(store_id)
+
+
+def storefront_artifact_path(store_id: int, name: str, encoding: str = "identity") -> Path:
+    return storefront_artifact_dir(store_id) / f"{name}.json{ARTIFACT_ENCODINGS[encoding]}"
+
+
+def _slug_pointer_path(slug: str) -> Path:
+    return _storefronts_root() / "slugs" / slug
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "wb") as out:
+        out.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_storefront_artifacts(payload: PublishedStoreOut) -> str:
+    """Пишет опубликованную витрину в MEDIA_ROOT вместе с gzip/brotli вариантами.
+
+    Артефакты лежат в каталоге магазина (по id, не по slug), а в имени есть
+    хэш содержимого, поэтому один URL всегда отдаёт одни и те же байты и его
+    можно кэшировать как immutable — даже если slug потом сменится или
+    достанется другому магазину. Указатель slug -> артефакт пишется последним
+    и переключает витрину на новую версию. Возвращает имя артефакта.
+    """
+    body = payload.model_dump_json().encode("utf-8")
+    name = f"{payload.version or 0}-{hashlib.sha1(body).hexdigest()[:16]}"
+    storefront_artifact_dir(payload.id).mkdir(parents=True, exist_ok=True)
+
+    _write_atomic(storefront_artifact_path(payload.id, name), body)
+    _write_atomic(storefront_artifact_path(payload.id, name, "gzip"), gzip.compress(body, compresslevel=9, mtime=0))
+    _write_atomic(storefront_artifact_path(payload.id, name, "br"), brotli.compress(body, quality=11))
+    pointer = _slug_pointer_path(payload.slug)
+    pointer.parent.mkdir(parents=True, exist_ok=True)
+    _write_atomic(pointer, f"{payload.id} {name}".encode())
+    return name
+
+
+def read_current_artifact(slug: str) -> tuple[int, str] | None:
+    """(store_id, имя артефакта) текущей витрины по slug."""
+    try:
+        store_id, name = _slug_pointer_path(slug).read_text().split()
+        return int(store_id), name
+    except (OSError, ValueError):
+        return None
+
+
+def unlink_storefront_slug(store_id: int, slug: str) -> None:
+    """Убирает указатель slug, если он ещё ведёт на этот магазин (slug мог занять другой)."""
+    current = read_current_artifact(slug)
+    if current is not None and current[0] == store_id:
+        _slug_pointer_path(slug).unlink(missing_ok=True)
+
+
+def remove_storefront_artifacts(store_id: int, slug: str | None) -> None:
+    if slug:
+        unlink_storefront_slug(store_id, slug)
+    shutil.rmtree(storefront_artifact_dir(store_id), ignore_errors=True)
+
+
+@dataclass(frozen=True)
+class CachedStorefront:
+    store_id: int
+    version: int
+    etag: str
+    body: bytes
+    expires_at: float
+
+
+class StorefrontCache:
+    """LRU-кэш сериализованных публичных витрин.
+
+    Ключ — slug, в записи хранится версия дизайна, поэтому пара (slug, version)
+    однозначно определяет тело ответа и ETag. Кэш живёт в памяти процесса,
+    сбрасывается при публикации/изменении дизайна и изменении магазина.
+    TTL ограничивает устаревание в воркерах, которые не видели инвалидацию.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, CachedStorefront] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, slug: str) -> CachedStorefront | None:
+        entry = self._entries.get(slug)
+        if entry is None or entry.expires_at < time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(slug)
+        self.hits += 1
+        return entry
+
+    def put(self, slug: str, payload: PublishedStoreOut) -> CachedStorefront:
+        body = payload.model_dump_json().encode("utf-8")
+        digest = hashlib.sha1(body).hexdigest()[:16]
+        entry = CachedStorefront(
+            store_id=payload.id,
+            version=payload.version or 0,
+            etag=f'"{payload.id}-{payload.version or 0}-{digest}"',
+            body=body,
+            expires_at=time.monotonic() + self.ttl,
+        )
+        self._entries[slug] = entry
+        self._entries.move_to_end(slug)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate_store(self, store_id: int) -> None:
+        # slug мог измениться, поэтому ищем по store_id, а не по ключу
+        stale = [slug for slug, entry in self._entries.items() if entry.store_id == store_id]
+        for slug in stale:
+            del self._entries[slug]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+storefront_cache = StorefrontCache(settings.STOREFRONT_CACHE_SIZE, settings.STOREFRONT_CACHE_TTL)
@@ -1,26 +1,185 @@
 import uuid
 import base64
+import logging
+import time
+
 import httpx
 
-async def create_payment(shop_id: str, secret_key: str, payment_data: dict):
-    authorization_header_value = f'Basic {base64.b64encode(f"{shop_id}:{secret_key}".encode()).decode()}'
-    idempotence_key = str(uuid.uuid4())
-
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            'https://api.yookassa.ru/v3/payments',
-            json=payment_data,
-            headers={
-                'Authorization': authorization_header_value,
-                'Idempotence-Key': idempotence_key
-            }
-        )
-        if response.status_code == 200:
-            payment_response = response.json()
-            print("Payment created successfully:", payment_response) # TODO нормальное логгирование
-            return payment_response['id']
-        else:
-            raise Exception(f"Error creating payment: {response.text}")
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentProviderUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """После failure_threshold ошибок подряд перестаёт ходить к провайдеру на reset_timeout секунд.
+
+    По истечении таймаута пропускает один пробный запрос (half-open): успех
+    закрывает цепь, ошибка снова открывает её.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "open" or (state == "half-open" and self._probe_in_flight):
+            raise PaymentProviderUnavailable("Payment provider is unavailable, circuit is open")
+        if state == "half-open":
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Вызов прервался, не дав ответа о провайдере: следующий запрос снова может стать пробным."""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class CallMetrics:
+    def __init__(self):
+        self._calls: dict[str, dict] = {}
+
+    def record(self, operation: str, seconds: float, ok: bool) -> None:
+        stats = self._calls.setdefault(operation, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+        ms = seconds * 1000
+        stats["count"] += 1
+        stats["errors"] += 0 if ok else 1
+        stats["total_ms"] += ms
+        stats["max_ms"] = max(stats["max_ms"], ms)
+
+    def snapshot(self) -> dict:
+        return {
+            operation: {**stats, "avg_ms": stats["total_ms"] / stats["count"] if stats["count"] else 0.0}
+            for operation, stats in self._calls.items()
+        }
+
+
+breaker = CircuitBreaker(settings.YOOKASSA_BREAKER_THRESHOLD, settings.YOOKASSA_BREAKER_RESET)
+metrics = CallMetrics()
+_client: httpx.AsyncClient | None = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=settings.YOOKASSA_API_URL.rstrip("/"),
+        http2=settings.YOOKASSA_HTTP2,
+        timeout=httpx.Timeout(settings.YOOKASSA_READ_TIMEOUT, connect=settings.YOOKASSA_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=settings.YOOKASSA_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.YOOKASSA_MAX_KEEPALIVE,
+            keepalive_expiry=settings.YOOKASSA_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+async def start_client() -> None:
+    global _client
+    if _client is None:
+        _client = _build_client()
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    # клиент создаётся в lifespan приложения; лениво — для запуска вне его (скрипты)
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
+
+
+def _auth_header(shop_id: str, secret_key: str) -> str:
+    return f'Basic {base64.b64encode(f"{shop_id}:{secret_key}".encode()).decode()}'
+
+
+async def _request(operation: str, method: str, path: str, **kwargs) -> httpx.Response:
+    breaker.before_call()
+    started = time.perf_counter()
+    try:
+        response = await _get_client().request(method, path, **kwargs)
+    except httpx.HTTPError:
+        metrics.record(operation, time.perf_counter() - started, ok=False)
+        breaker.record_failure()
+        raise
+    except BaseException:
+        # отмена (разрыв клиента, wait_for, остановка воркера) или чужая ошибка —
+        # иначе флаг пробного запроса остался бы навсегда и цепь не закрылась бы
+        breaker.release_probe()
+        raise
+
+    ok = response.status_code < 500
+    metrics.record(operation, time.perf_counter() - started, ok=ok)
+    # 4xx — ошибка запроса, а не деградация провайдера, цепь из-за неё не размыкаем
+    if ok:
+        breaker.record_success()
+    else:
+        breaker.record_failure()
+    logger.debug("YooKassa %s %s -> %s", method, path, response.status_code)
+    return response
+
+
+async def create_payment(shop_id: str, secret_key: str, payment_data: dict, idempotence_key: str | None = None):
+    idempotence_key = idempotence_key or str(uuid.uuid4())
+
+    response = await _request(
+        "create_payment",
+        "POST",
+        "/payments",
+        json=payment_data,
+        headers={
+            'Authorization': _auth_header(shop_id, secret_key),
+            'Idempotence-Key': idempotence_key
+        }
+    )
+    if response.status_code == 200:
+        payment_response = response.json()
+        logger.info("Payment %s created", payment_response['id'])
+        return payment_response['id']
+    else:
+        raise Exception(f"Error creating payment: {response.text}")
+
+async def get_payment(shop_id: str, secret_key: str, payment_id: str) -> dict | None:
+    """Объект платежа у провайдера; None, если такого платежа нет."""
+    response = await _request(
+        "get_payment",
+        "GET",
+        f"/payments/{payment_id}",
+        headers={'Authorization': _auth_header(shop_id, secret_key)}
+    )
+    if response.status_code == 200:
+        return response.json()
+    if response.status_code == 404:
+        return None
+    raise Exception(f"Error getting payment {payment_id}: {response.text}")
 
 # TODO ДЛЯ ТЕСТА, ПОТОМ УБРАТЬ
 if __name__ == "__main__":
@@ -0,0 +1,70 @@
+"""Латентность оформления заказа в зависимости от числа позиций.
+
+Запускается против поднятого API (docker compose up):
+
+    python benchmarks/checkout_latency.py --store-id 1 --product-ids 1,2,3 --sizes 1,5,10,25,50
+
+Каждый заказ списывает остатки, поэтому у товаров должен быть запас
+(или hasLimit=false в variants).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _checkout(client: httpx.AsyncClient, store_id: int, product_ids: list[int], size: int) -> float:
+    payload = {
+        "store_id": store_id,
+        "customer_email": "bench@example.com",
+        "items": [{"product_id": product_ids[i % len(product_ids)], "quantity": 1} for i in range(size)],
+    }
+    started = time.perf_counter()
+    response = await client.post("/v1/api/orders/", json=payload)
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    return elapsed * 1000
+
+
+async def main(args: argparse.Namespace) -> None:
+    product_ids = [int(pid) for pid in args.product_ids.split(",")]
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+        print(f"{'items':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9}")
+        for size in sizes:
+            for _ in range(args.warmup):
+                await _checkout(client, args.store_id, product_ids, size)
+
+            samples: list[float] = []
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def one():
+                async with semaphore:
+                    samples.append(await _checkout(client, args.store_id, product_ids, size))
+
+            await asyncio.gather(*(one() for _ in range(args.requests)))
+            print(
+                f"{size:>6} {_percentile(samples, 50):>9.1f} {_percentile(samples, 95):>9.1f} "
+                f"{_percentile(samples, 99):>9.1f} {statistics.mean(samples):>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:9000")
+    parser.add_argument("--store-id", type=int, required=True)
+    parser.add_argument("--product-ids", required=True, help="comma-separated product ids of the store")
+    parser.add_argument("--sizes", default="1,5,10,25,50", help="comma-separated item counts per order")
+    parser.add_argument("--requests", type=int, default=200, help="orders per item count")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
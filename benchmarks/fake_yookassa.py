@@ -0,0 +1,68 @@
+"""Локальная заглушка API ЮKassa для проверки оплаты и сверки платежей.
+
+    uvicorn benchmarks.fake_yookassa:app --port 8090
+    YOOKASSA_API_URL=http://localhost:8090 python -m app.commands.reconcile_payments --min-age 0
+
+Платежи живут в памяти. При первом чтении платёж «завершается»: с
+вероятностью FAKE_YOOKASSA_SUCCESS_RATE он succeeded, иначе canceled.
+FAKE_YOOKASSA_LATENCY добавляет задержку к каждому ответу (секунды), а
+FAKE_YOOKASSA_ERROR_RATE — долю ответов 500, чтобы проверить повторы и
+размыкание цепи. Чтобы у заказов были платежи в заглушке, приложение при
+оформлении заказов должно смотреть на неё же.
+"""
+import asyncio
+import os
+import random
+import uuid
+
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import JSONResponse
+
+SUCCESS_RATE = float(os.getenv("FAKE_YOOKASSA_SUCCESS_RATE", "0.8"))
+ERROR_RATE = float(os.getenv("FAKE_YOOKASSA_ERROR_RATE", "0"))
+LATENCY = float(os.getenv("FAKE_YOOKASSA_LATENCY", "0.05"))
+
+app = FastAPI(title="Fake YooKassa")
+
+payments: dict[str, dict] = {}
+idempotence_keys: dict[str, str] = {}
+
+
+async def _simulate() -> JSONResponse | None:
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    if random.random() < ERROR_RATE:
+        return JSONResponse({"type": "error", "code": "internal_server_error"}, status_code=500)
+    return None
+
+
+@app.post("/payments")
+async def create_payment(request: Request, idempotence_key: str = Header(...)):
+    if failure := await _simulate():
+        return failure
+    if idempotence_key in idempotence_keys:
+        return payments[idempotence_keys[idempotence_key]]
+
+    data = await request.json()
+    payment_id = str(uuid.uuid4())
+    payments[payment_id] = {
+        "id": payment_id,
+        "status": "pending",
+        "amount": data["amount"],
+        "metadata": data.get("metadata", {}),
+        "confirmation": {"type": "redirect", "confirmation_url": f"https://fake.local/pay/{payment_id}"},
+    }
+    idempotence_keys[idempotence_key] = payment_id
+    return payments[payment_id]
+
+
+@app.get("/payments/{payment_id}")
+async def get_payment(payment_id: str):
+    if failure := await _simulate():
+        return failure
+    payment = payments.get(payment_id)
+    if payment is None:
+        return JSONResponse({"type": "error", "code": "not_found"}, status_code=404)
+    if payment["status"] == "pending":
+        payment["status"] = "succeeded" if random.random() < SUCCESS_RATE else "canceled"
+    return payment
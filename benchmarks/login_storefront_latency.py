@@ -0,0 +1,86 @@
+"""Латентность витрины, пока параллельно идут логины.
+
+Запускается против поднятого API (docker compose up):
+
+    python benchmarks/login_storefront_latency.py --slug my-store --email bench@example.com --password secret
+
+Сначала меряется витрина без нагрузки, затем — при --login-concurrency
+одновременных логинах. Если bcrypt блокирует event loop, p99 витрины во
+втором прогоне вырастет на десятки миллисекунд. Пользователь должен
+существовать. Ответы 503 на логины (переполнена очередь хэширования)
+считаются отдельно.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _storefront(client: httpx.AsyncClient, slug: str, requests: int, concurrency: int) -> list[float]:
+    samples: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(f"/v1/api/public/{slug}")
+            samples.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return samples
+
+
+async def _login_flood(client: httpx.AsyncClient, email: str, password: str, stop: asyncio.Event, counters: dict) -> None:
+    while not stop.is_set():
+        response = await client.post("/v1/api/auth/login", json={"email": email, "password": password})
+        counters[response.status_code] = counters.get(response.status_code, 0) + 1
+
+
+def _report(label: str, samples: list[float]) -> None:
+    print(
+        f"{label:>14} {_percentile(samples, 50):>9.1f} {_percentile(samples, 95):>9.1f} "
+        f"{_percentile(samples, 99):>9.1f} {statistics.mean(samples):>9.1f}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency + args.login_concurrency + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30, limits=limits) as client:
+        await _storefront(client, args.slug, args.warmup, 1)
+        print(f"{'':>14} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9}")
+        _report("idle", await _storefront(client, args.slug, args.requests, args.concurrency))
+
+        stop = asyncio.Event()
+        counters: dict[int, int] = {}
+        logins = [
+            asyncio.create_task(_login_flood(client, args.email, args.password, stop, counters))
+            for _ in range(args.login_concurrency)
+        ]
+        await asyncio.sleep(1)
+        samples = await _storefront(client, args.slug, args.requests, args.concurrency)
+        stop.set()
+        await asyncio.gather(*logins)
+        _report("during logins", samples)
+        print("login responses:", ", ".join(f"{code}: {count}" for code, count in sorted(counters.items())))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:9000")
+    parser.add_argument("--slug", required=True, help="slug of a published store")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--requests", type=int, default=1000, help="storefront requests per run")
+    parser.add_argument("--concurrency", type=int, default=10, help="parallel storefront requests")
+    parser.add_argument("--login-concurrency", type=int, default=20, help="parallel login loops")
+    parser.add_argument("--warmup", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,70 @@
+"""Локальный SMTP-приёмник: принимает письма и печатает их, ничего не отправляя.
+
+    python benchmarks/smtp_sink.py --port 1025
+    SMTP_HOST=localhost SMTP_PORT=1025 SMTP_USE_SSL=false SMTP_USER= MAIL_FROM=dev@localhost uvicorn app.main:app
+
+Поддерживает ровно то, что нужно smtplib без TLS и авторизации: EHLO/HELO,
+MAIL, RCPT, DATA, RSET, NOOP, QUIT. --delay замедляет каждое письмо, чтобы
+проверить, что запросы API отправку не ждут; --drop-every N рвёт соединение
+на каждом N-м письме, чтобы проверить переподключение и повторы; --reject ADDR
+отвечает 550 на RCPT для этого адреса, чтобы проверить отказ в одном письме.
+"""
+import argparse
+import asyncio
+import itertools
+
+counter = itertools.count(1)
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, args: argparse.Namespace) -> None:
+    async def reply(line: str) -> None:
+        writer.write(f"{line}\r\n".encode())
+        await writer.drain()
+
+    await reply("220 smtp-sink ready")
+    while line := await reader.readline():
+        command = line.decode(errors="replace").strip()
+        verb = command[:4].upper()
+        if verb == "EHLO":
+            await reply("250-smtp-sink")
+            await reply("250 8BITMIME")
+        elif verb == "RCPT" and any(address in command for address in args.reject):
+            await reply("550 Mailbox unavailable")
+        elif verb in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+            await reply("250 OK")
+        elif verb == "DATA":
+            await reply("354 End data with <CR><LF>.<CR><LF>")
+            lines = []
+            while (data := await reader.readline()) not in (b".\r\n", b".\n", b""):
+                lines.append(data.decode(errors="replace").rstrip("\r\n"))
+            number = next(counter)
+            if args.drop_every and number % args.drop_every == 0:
+                print(f"--- message {number}: dropping connection")
+                break
+            if args.delay:
+                await asyncio.sleep(args.delay)
+            print(f"--- message {number}\n" + "\n".join(lines))
+            await reply("250 OK queued")
+        elif verb == "QUIT":
+            await reply("221 Bye")
+            break
+        else:
+            await reply("502 Command not implemented")
+    writer.close()
+
+
+async def main(args: argparse.Namespace) -> None:
+    server = await asyncio.start_server(lambda r, w: _handle(r, w, args), args.host, args.port)
+    print(f"SMTP sink listening on {args.host}:{args.port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to wait before accepting each message")
+    parser.add_argument("--drop-every", type=int, default=0, help="drop the connection on every N-th message")
+    parser.add_argument("--reject", action="append", default=[], help="answer 550 to RCPT for this address")
+    asyncio.run(main(parser.parse_args()))
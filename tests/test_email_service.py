@@ -0,0 +1,45 @@
+import argparse
+import asyncio
+from email.mime.text import MIMEText
+
+from app.config import settings
+from app.services.email_service import MailQueueWorker
+from benchmarks.smtp_sink import _handle
+
+
+def _message(to: str) -> MIMEText:
+    msg = MIMEText("test")
+    msg["Subject"] = "test"
+    msg["From"] = "dev@localhost"
+    msg["To"] = to
+    return msg
+
+
+async def _run_batch_against_sink(monkeypatch, recipients: list[str], reject: list[str]) -> MailQueueWorker:
+    args = argparse.Namespace(delay=0.0, drop_every=0, reject=reject)
+    server = await asyncio.start_server(lambda r, w: _handle(r, w, args), "127.0.0.1", 0)
+    monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_PORT", server.sockets[0].getsockname()[1])
+    monkeypatch.setattr(settings, "SMTP_USE_SSL", False)
+    monkeypatch.setattr(settings, "SMTP_USER", "")
+    async with server:
+        worker = MailQueueWorker()
+        for to in recipients:
+            worker.enqueue(_message(to))
+        await worker.run_once()
+        await asyncio.to_thread(worker._close)
+    return worker
+
+
+def test_rejected_recipient_does_not_fail_rest_of_batch(monkeypatch):
+    worker = asyncio.run(_run_batch_against_sink(
+        monkeypatch, ["rejected@example.com", "a@example.com", "b@example.com"], reject=["rejected@example.com"],
+    ))
+
+    assert worker.stats() == {"queued": 0, "sent": 2, "failed": 1, "dropped": 0}
+
+
+def test_batch_is_delivered(monkeypatch):
+    worker = asyncio.run(_run_batch_against_sink(monkeypatch, ["a@example.com", "b@example.com"], reject=[]))
+
+    assert worker.stats() == {"queued": 0, "sent": 2, "failed": 0, "dropped": 0}